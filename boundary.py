@@ -1,7 +1,15 @@
 from line_generator import LineGenerator
+from random_stream import create_seed, create_stream
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import constants
 
 
+# Fewest cells of all segments together which are generated in worker processes.
+# Starting a pool takes about 0.1 s, in which about 40 000 cells are generated in-process
+MIN_POOL_CELLS = 100000
+
+
 class Boundary():
     """Used to create a random line. It could be a boundary, circling around
      to its starting point or a path from one point to another"""
@@ -11,7 +19,7 @@ class Boundary():
                  line_terrain: int = -1, primary_terrain: int = -1,
                  secondary_terrain: int = -1, line_margin: int = 1,
                  forbid_full_turn: bool = False, clockwise_rotation: bool = False,
-                 enclosing: bool = True):
+                 enclosing: bool = True, seed: int = None, backtrack_steps: int = 0):
         """Creates a random line.
 
         Args:
@@ -36,7 +44,13 @@ class Boundary():
                 if false, line cannot go directly against exit
             clockwise_rotation:
                 for boundaries creating an enclosed area,
-                describes placement of primary terrain relative to entry"""
+                describes placement of primary terrain relative to entry
+            seed:
+                world seed. Each segment draws randomness from its own stream,
+                derived from the seed, the boundary start and the segment index
+            backtrack_steps:
+                how far a line segment backtracks from a dead end.
+                With 0, segments start over instead"""
         self.path: list[LineGenerator] = []
         self.length = length
         self.height = height
@@ -48,6 +62,12 @@ class Boundary():
         self.forbid_full_turn = forbid_full_turn
         self.clockwise_rotation = clockwise_rotation
         self.enclosing = enclosing
+        self.backtrack_steps = backtrack_steps
+        self.generation = 0
+
+        if seed is None:
+            seed = create_seed()
+        self.seed = seed
 
         if line_terrain == -1:
             self.line_terrain = primary_terrain
@@ -79,27 +99,65 @@ class Boundary():
         """Returns the boundary path, containing generated terrain for each cell"""
         return self.path
 
-    def generate(self) -> None:
-        """Generates paths and terrain for this boundary"""
-        segment = self.path[0]
-        segment.random_walk(self.line_margin, self.forbid_full_turn)
-        segment.paint_terrain(
-            self.line_terrain, self.primary_terrain, self.secondary_terrain)
-
-        for index in range(1, len(self.path) - 1):
-            previous = segment
-            segment = self.path[index]
-            segment.inherit_start(previous)
-            segment.random_walk(self.line_margin, self.forbid_full_turn)
-            segment.paint_terrain(
-                self.line_terrain, self.primary_terrain, self.secondary_terrain)
-
+    def get_statistics(self) -> list[dict[str, int]]:
+        """Returns the amount of steps taken, backtracks and restarts of each segment
+        in the latest generation, in path order. See LineGenerator.get_statistics"""
+        return [segment.get_statistics() for segment in self.path]
+
+    def _assign_streams(self) -> None:
+        """Gives each segment a new random stream.
+        Streams only depend on the seed, the boundary start, the segment index
+        and how many times the boundary has been generated"""
+        for index, segment in enumerate(self.path):
+            segment.rng = create_stream(self.seed, "boundary", self.start_x, self.start_y,
+                                        self.generation, index)
+        self.generation += 1
+
+    def _place_joins(self) -> None:
+        """Places the start and end points of every segment,
+        so the segments can be generated independently of each other.
+        Points already placed are kept"""
+        first = self.path[0]
         last = self.path[-1]
-        last.inherit_start(segment)
 
-        if self.enclosing:
-            last.inherit_end(self.path[0])
+        if first.start_x == -1:
+            first.generate_start()
+
+        for index, segment in enumerate(self.path):
+            if index > 0:
+                segment.inherit_start(self.path[index - 1])
 
-        last.random_walk(self.line_margin, self.forbid_full_turn)
-        last.paint_terrain(self.line_terrain,
-                           self.primary_terrain, self.secondary_terrain)
+            if index > 0 and segment is last and self.enclosing:
+                segment.inherit_end(first)
+            elif segment.end_x == -1:
+                segment.generate_end()
+
+    def generate(self, workers: int = 1) -> None:
+        """Generates paths and terrain for this boundary.
+        Segments are generated in a pool of worker processes, if there are several workers
+        and at least MIN_POOL_CELLS cells. The result doesn't depend on the amount of workers"""
+        self._assign_streams()
+        self._place_joins()
+        settings = (self.line_margin, self.forbid_full_turn, self.backtrack_steps,
+                    self.line_terrain, self.primary_terrain, self.secondary_terrain)
+
+        cells = self.length * self.height * len(self.path)
+
+        if workers > 1 and len(self.path) > 1 and cells >= MIN_POOL_CELLS:
+            with ProcessPoolExecutor(workers) as executor:
+                self.path = list(executor.map(_generate_segment, self.path, repeat(settings)))
+        else:
+            for segment in self.path:
+                _generate_segment(segment, settings)
+
+
+def _generate_segment(segment: LineGenerator, settings: tuple) -> LineGenerator:
+    """Generates the path and terrain of a segment with placed start and end points.
+    Settings hold the line margin, forbid full turn, backtrack steps,
+    and the line, primary and secondary terrain of the boundary.
+    Returns the segment, since worker processes generate a copy"""
+    margin, forbid_full_turn, backtrack_steps, line_terrain, primary_terrain, \
+        secondary_terrain = settings
+    segment.random_walk(margin, forbid_full_turn, backtrack_steps)
+    segment.paint_terrain(line_terrain, primary_terrain, secondary_terrain)
+    return segment
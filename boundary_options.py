@@ -22,6 +22,16 @@ class BoundaryOptions():
         self.type.addItem("Lake")
         self.layout.addWidget(self.type)
 
+        self.backtrack_label = QtWidgets.QLabel("Backtrack steps")
+        self.layout.addWidget(self.backtrack_label)
+
+        self.backtrack_steps = QtWidgets.QSpinBox()
+        self.backtrack_steps.setMinimum(0)
+        self.backtrack_steps.setMaximum(50)
+        self.backtrack_steps.setSingleStep(1)
+        self.backtrack_steps.setValue(4)
+        self.layout.addWidget(self.backtrack_steps)
+
         self.generate_button = QtWidgets.QPushButton("Generate boundary")
         self.generate_button.clicked.connect(main.generate_coastline)
         self.layout.addWidget(self.generate_button)
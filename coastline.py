@@ -0,0 +1,157 @@
+import numpy as np
+import constants
+
+
+# Sides of a square, in the order used for indexing
+SIDES = (constants.NORTH, constants.EAST, constants.SOUTH, constants.WEST)
+
+# Movement (dx, dy) when leaving a square through each side
+SIDE_OFFSETS = np.array([[0, -1], [1, 0], [0, 1], [-1, 0]], dtype=np.int64)
+
+# Position (dx, dy) of the enclosed region on the right hand side,
+# relative to the northwest region, when leaving a square through each side
+RIGHT_OFFSETS = np.array([[1, 0], [1, 1], [0, 1], [0, 0]], dtype=np.int64)
+
+# Bits of the square case for each corner of a square
+NORTHEAST_BIT = 1
+SOUTHEAST_BIT = 2
+SOUTHWEST_BIT = 4
+NORTHWEST_BIT = 8
+
+# Corners (right, left) beside each side of a square,
+# when travelling out of the square through that side
+EXIT_CORNERS = ((NORTHEAST_BIT, NORTHWEST_BIT), (SOUTHEAST_BIT, NORTHEAST_BIT),
+                (SOUTHWEST_BIT, SOUTHEAST_BIT), (NORTHWEST_BIT, SOUTHWEST_BIT))
+
+
+def _create_exit_table() -> np.ndarray:
+    """Returns the exit side index of a line travelling clockwise around enclosed regions,
+    indexed by (square case, entrance side index). Entrances the line can't take are -1.
+    Where two enclosed regions only meet diagonally, they are kept apart"""
+    table = np.full((16, 4), -1, dtype=np.int8)
+
+    for case in range(16):
+        exits = [side for side, (right, left) in enumerate(EXIT_CORNERS)
+                 if case & right and not case & left]
+
+        for entrance in range(4):
+            # Entering through a side swaps the corners on the right and left
+            left, right = EXIT_CORNERS[entrance]
+            if not (case & right and not case & left):
+                continue
+
+            if len(exits) == 1:
+                table[case, entrance] = exits[0]
+            else:
+                # Turn sharply, staying next to the enclosed region entered along
+                exit = constants.angle_direction(SIDES[entrance], 6)
+                table[case, entrance] = SIDES.index(exit)
+    return table
+
+
+EXIT_TABLE = _create_exit_table()
+
+
+class Coastline():
+    """A closed line around enclosed regions, such as land, travelling clockwise.
+    The line passes through squares between four regions.
+    Each square is given by the position of its northwest region"""
+
+    def __init__(self, x: int, y: int, entrance: int, exits: np.ndarray):
+        """Creates a coastline starting at the square (x, y).
+
+        Args:
+            entrance:
+                side of the first square where the line enters (NORTH, EAST, SOUTH, WEST)
+            exits:
+                side of each square where the line leaves, as direction constants"""
+        self.x = x
+        self.y = y
+        self.entrance = entrance
+        self.exits: np.ndarray = exits
+
+    def __len__(self) -> int:
+        return len(self.exits)
+
+    def get_squares(self, length: int) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the positions (x, y) of the northwest region of each square.
+        The x-values wrap around the given length.
+        The y-values are -1 or height - 1 for squares beyond the poles"""
+        offsets = SIDE_OFFSETS[(self.exits[:-1] - 1) // 2]
+        x = self.x + np.concatenate([[0], np.cumsum(offsets[:, 0])])
+        y = self.y + np.concatenate([[0], np.cumsum(offsets[:, 1])])
+        return (x % length, y)
+
+    def get_enclosed_regions(self, length: int) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the positions (x, y) of the enclosed region
+        on the right hand side of the line, when leaving each square"""
+        x, y = self.get_squares(length)
+        offsets = RIGHT_OFFSETS[(self.exits - 1) // 2]
+        return ((x + offsets[:, 0]) % length, y + offsets[:, 1])
+
+
+def find_coastlines(enclosed: np.ndarray) -> list[Coastline]:
+    """Finds the lines around every area where enclosed is true, in one pass.
+    Areas wrap around horizontally. Beyond the poles, nothing is enclosed,
+    so lines along a pole pass through squares beyond it.
+    Lines around areas, such as lakes, within an enclosed area are found as well.
+    Coastlines are ordered by their northwesternmost square"""
+    height, length = enclosed.shape
+    padded = np.zeros((height + 2, length), dtype=np.uint8)
+    padded[1:-1] = enclosed
+
+    # Square rows run from the square beyond the north pole to the one beyond the south pole
+    northwest = padded[:-1]
+    northeast = np.roll(northwest, -1, axis=1)
+    southwest = padded[1:]
+    southeast = np.roll(southwest, -1, axis=1)
+    cases = (northeast * NORTHEAST_BIT | southeast * SOUTHEAST_BIT
+             | southwest * SOUTHWEST_BIT | northwest * NORTHWEST_BIT).ravel()
+
+    # Each crossing of a square is a node, given by square * 4 + entrance side index
+    exits = EXIT_TABLE[cases].ravel()
+    nodes = np.flatnonzero(exits >= 0)
+
+    if len(nodes) == 0:
+        return []
+
+    squares, entrances = np.divmod(nodes, 4)
+    exits = exits[nodes].astype(np.int64)
+    rows, columns = np.divmod(squares, length)
+    next_rows = rows + SIDE_OFFSETS[exits, 1]
+    next_columns = (columns + SIDE_OFFSETS[exits, 0]) % length
+    next_nodes = (next_rows * length + next_columns) * 4 + (exits + 2) % 4
+
+    index = np.full(len(cases) * 4, -1, dtype=np.int64)
+    index[nodes] = np.arange(len(nodes))
+    successors = index[next_nodes]
+
+    # Label each node by the first node of its cycle, by repeatedly doubling the jumps
+    labels = np.arange(len(nodes))
+    jumps = successors
+    span = 1
+    while span < len(nodes):
+        labels = np.minimum(labels, labels[jumps])
+        jumps = jumps[jumps]
+        span *= 2
+
+    # Cut each cycle before its first node, and count the steps to the cut
+    last = successors == labels
+    jumps = np.where(last, np.arange(len(nodes)), successors)
+    steps = np.where(last, 0, 1)
+    span = 1
+    while span < len(nodes):
+        steps = steps + steps[jumps]
+        jumps = jumps[jumps]
+        span *= 2
+
+    order = np.lexsort((-steps, labels))
+    starts = np.flatnonzero(np.diff(labels[order], prepend=-1))
+    exit_sides = np.array(SIDES, dtype=np.uint8)[exits[order]]
+    coastlines = []
+
+    for start, end in zip(starts, np.append(starts[1:], len(order))):
+        first = order[start]
+        coastlines.append(Coastline(int(columns[first]), int(rows[first]) - 1,
+                                    SIDES[entrances[first]], exit_sides[start:end]))
+    return coastlines
@@ -80,6 +80,30 @@ class ContinentOptions():
         self.sea_mountain.clicked.connect(main.create_mountains_by_sea)
         self.layout.addWidget(self.sea_mountain)
 
+        self.min_land_offset_label = QtWidgets.QLabel("Minimum distance\nto land plate")
+        self.layout.addWidget(self.min_land_offset_label)
+
+        self.min_land_offset = QtWidgets.QSpinBox()
+        self.min_land_offset.setMinimum(1)
+        self.min_land_offset.setMaximum(20)
+        self.min_land_offset.setSingleStep(1)
+        self.min_land_offset.setValue(1)
+        self.layout.addWidget(self.min_land_offset)
+
+        self.max_land_offset_label = QtWidgets.QLabel("Maximum distance\nto land plate")
+        self.layout.addWidget(self.max_land_offset_label)
+
+        self.max_land_offset = QtWidgets.QSpinBox()
+        self.max_land_offset.setMinimum(1)
+        self.max_land_offset.setMaximum(20)
+        self.max_land_offset.setSingleStep(1)
+        self.max_land_offset.setValue(1)
+        self.layout.addWidget(self.max_land_offset)
+
+        self.all_mountain = QtWidgets.QPushButton("Generate on all plates")
+        self.all_mountain.clicked.connect(main.create_all_mountains)
+        self.layout.addWidget(self.all_mountain)
+
         self.erase_mountain = QtWidgets.QPushButton("Erase mountains")
         self.erase_mountain.clicked.connect(main.erase_mountains)
         self.layout.addWidget(self.erase_mountain)
@@ -0,0 +1,144 @@
+from world import World
+import numpy as np
+import argparse
+import time
+import constants
+
+
+# Size in regions of a standard world, the same as in the user interface
+WORLD_LENGTH = 60
+WORLD_HEIGHT = 30
+
+
+class GenerationSettings():
+    """Settings for generating tectonic plates and continents.
+    Mirrors the tectonic plate options"""
+
+    def __init__(self, algorithm: str = "Relative growth", min_growth: int = 4,
+                 max_growth: int = 4, land_plates: int = 7, sea_plates: int = 1,
+                 supercontinent: bool = False, margin: float = 0.2,
+                 island_rate: float = 0.01, high_resolution: bool = True):
+        self.algorithm = algorithm
+        self.min_growth = min_growth
+        self.max_growth = max_growth
+        self.land_plates = land_plates
+        self.sea_plates = sea_plates
+        self.supercontinent = supercontinent
+        self.margin = margin
+        self.island_rate = island_rate
+        self.high_resolution = high_resolution
+
+    @staticmethod
+    def from_options(plate_options) -> "GenerationSettings":
+        """Reads settings from the tectonic plate options"""
+        return GenerationSettings(
+            algorithm=plate_options.algorithm.currentText(),
+            min_growth=plate_options.min_growth.value(),
+            max_growth=plate_options.max_growth.value(),
+            land_plates=plate_options.land_plates.value(),
+            sea_plates=plate_options.sea_plates.value(),
+            supercontinent=plate_options.supercontinent_toggle.isChecked(),
+            margin=plate_options.plate_margin.value(),
+            island_rate=plate_options.island_rate.value(),
+            high_resolution=plate_options.high_resolution.isChecked())
+
+    def get_precision(self) -> str:
+        """Returns the size of the areas claimed by plates"""
+        if self.high_resolution:
+            return constants.SUBREGION
+        else:
+            return constants.REGION
+
+    def create_plates(self, world: World) -> None:
+        """Creates the starting points of tectonic plates in the world"""
+        if self.high_resolution:
+            world_map = world.subregions
+            growth_scale = 4
+        else:
+            world_map = world.regions
+            growth_scale = 1
+
+        world.create_plates(
+            land_amount=self.land_plates,
+            water_amount=self.sea_plates,
+            margin=self.margin,
+            island_rate=self.island_rate,
+            min_growth=self.min_growth * growth_scale,
+            max_growth=self.max_growth * growth_scale,
+            odd_amount=1 if self.supercontinent else 0,
+            odd_growth=8 * growth_scale,
+            world_map=world_map,
+            fixed_growth=self.algorithm == "Fixed growth",
+            flood_growth=self.algorithm == "Flood growth")
+
+
+def generate(settings: GenerationSettings, seed: int = None, world: World = None) -> World:
+    """Generates a finished world, with plates, continents and plate boundaries.
+    Runs without a user interface. Creates a standard world if none is given.
+    If a seed is given, it replaces the seed of the world"""
+    if world is None:
+        world = World(length=WORLD_LENGTH, height=WORLD_HEIGHT, seed=seed)
+    elif seed is not None:
+        world.seed = seed
+
+    settings.create_plates(world)
+    world.build_plates()
+    world.finish_plates(settings.get_precision())
+    return world
+
+
+def save(world: World, path: str) -> None:
+    """Saves the terrain and plates of a world as a compressed NumPy archive"""
+    np.savez_compressed(path,
+                        region_terrain=world.region_layers.terrain,
+                        region_plate=world.region_layers.plate,
+                        subregion_terrain=world.subregion_layers.terrain,
+                        subregion_plate=world.subregion_layers.plate)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generates worlds without a user interface")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the first world")
+    parser.add_argument("--count", type=int, default=1,
+                        help="amount of worlds, using consecutive seeds")
+    parser.add_argument("--output", default="world_{seed}.npz",
+                        help="output path, {seed} is replaced by the world seed")
+    parser.add_argument("--length", type=int, default=WORLD_LENGTH)
+    parser.add_argument("--height", type=int, default=WORLD_HEIGHT)
+    parser.add_argument("--sub-length", type=int, default=360)
+    parser.add_argument("--sub-height", type=int, default=180)
+    parser.add_argument("--algorithm", default="Relative growth",
+                        choices=["Relative growth", "Fixed growth", "Flood growth"])
+    parser.add_argument("--min-growth", type=int, default=4)
+    parser.add_argument("--max-growth", type=int, default=4)
+    parser.add_argument("--land-plates", type=int, default=7)
+    parser.add_argument("--sea-plates", type=int, default=1)
+    parser.add_argument("--supercontinent", action="store_true")
+    parser.add_argument("--margin", type=float, default=0.2)
+    parser.add_argument("--island-rate", type=float, default=0.01)
+    parser.add_argument("--low-resolution", action="store_true",
+                        help="let plates claim regions instead of subregions")
+    args = parser.parse_args()
+
+    settings = GenerationSettings(algorithm=args.algorithm,
+                                  min_growth=args.min_growth,
+                                  max_growth=args.max_growth,
+                                  land_plates=args.land_plates,
+                                  sea_plates=args.sea_plates,
+                                  supercontinent=args.supercontinent,
+                                  margin=args.margin,
+                                  island_rate=args.island_rate,
+                                  high_resolution=not args.low_resolution)
+
+    for seed in range(args.seed, args.seed + args.count):
+        start = time.perf_counter()
+        world = generate(settings, seed, World(length=args.length, height=args.height,
+                                               sub_length=args.sub_length,
+                                               sub_height=args.sub_height, seed=seed))
+        path = args.output.format(seed=seed)
+        save(world, path)
+        print(f"Seed {seed}: {world.get_land_area():,} km2 land, "
+              f"{world.get_sea_area():,} km2 sea "
+              f"({time.perf_counter() - start:.2f} s) -> {path}")
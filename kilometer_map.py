@@ -0,0 +1,68 @@
+import numpy as np
+
+
+class KilometerMap():
+    """Stores the square kilometers of a single region as typed columns.
+    Square kilometers are laid out subregion by subregion,
+    so that each subregion covers a contiguous index range"""
+
+    COLUMNS = ("x", "y", "terrain", "subregion_x", "subregion_y", "subregion_border")
+
+    def __init__(self, region_x: int, region_y: int, x: np.ndarray, y: np.ndarray,
+                 terrain: np.ndarray, subregion_x: np.ndarray, subregion_y: np.ndarray,
+                 subregion_border: np.ndarray, subregion_ranges: np.ndarray):
+        """Creates a kilometer map of the region at (region_x, region_y).
+
+        Args:
+            x, y:
+                square kilometer coordinates. x is centered on the middle of the region
+            terrain:
+                square kilometer terrain
+            subregion_x, subregion_y:
+                coordinates of the subregion within the region
+            subregion_border:
+                true where the square kilometer is at the edge of a subregion
+            subregion_ranges:
+                (start, end) of the index range of each subregion,
+                indexed by (subregion y, subregion x)"""
+        self.region_x: int = region_x
+        self.region_y: int = region_y
+        self.x: np.ndarray = x
+        self.y: np.ndarray = y
+        self.terrain: np.ndarray = terrain
+        self.subregion_x: np.ndarray = subregion_x
+        self.subregion_y: np.ndarray = subregion_y
+        self.subregion_border: np.ndarray = subregion_border
+        self.subregion_ranges: np.ndarray = subregion_ranges
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """Returns a column, allowing access like km_map["terrain"]"""
+        if column in KilometerMap.COLUMNS or column == "subregion_ranges":
+            return getattr(self, column)
+        raise KeyError(column)
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def get_subregion_range(self, subregion_x: int, subregion_y: int) -> tuple[int, int]:
+        """Returns the index range (start, end) of a subregion within the region"""
+        start, end = self.subregion_ranges[subregion_y, subregion_x]
+        return (int(start), int(end))
+
+    def set_subregion_terrain(self, subregion_x: int, subregion_y: int, terrain: int) -> None:
+        """Sets the terrain of all square kilometers in a subregion within the region"""
+        start, end = self.get_subregion_range(subregion_x, subregion_y)
+        self.terrain[start:end] = terrain
+
+    def get_nbytes(self) -> int:
+        """Returns the memory used by the columns, in bytes"""
+        return sum(getattr(self, column).nbytes for column in KilometerMap.COLUMNS) \
+            + self.subregion_ranges.nbytes
+
+    def as_dicts(self) -> dict[str, list[int]]:
+        """Returns the columns as a dictionary of lists"""
+        data = {column: getattr(self, column).astype(int).tolist()
+                for column in KilometerMap.COLUMNS}
+        data["subregion_ranges"] = [[tuple(index_range) for index_range in row]
+                                    for row in self.subregion_ranges.tolist()]
+        return data
@@ -0,0 +1,342 @@
+from region_metrics import RegionMetrics
+import numpy as np
+import constants
+
+
+# Every terrain constant fits below this value
+TERRAIN_COUNT = 17
+
+# TERRAIN_TABLE[type, cathegory] is true if type belongs to the cathegory
+TERRAIN_TABLE = np.array([[constants.is_type(type, cathegory)
+                           for cathegory in range(TERRAIN_COUNT)]
+                          for type in range(TERRAIN_COUNT)], dtype=bool)
+
+# Plate boundary bits, one for each side of a cell
+BOUNDARY_BITS = {constants.NORTH: 1, constants.EAST: 2, constants.SOUTH: 4, constants.WEST: 8}
+
+# Most bytes of border distances kept, see LayerStore.get_border_distance.
+# The latest distances are kept even if larger
+DISTANCE_CACHE_BYTES = 2**26
+
+
+def get_type_mask(terrain: np.ndarray, cathegory: int) -> np.ndarray:
+    """Returns a boolean array, which is true where terrain belongs to the given cathegory.
+    Array version of constants.is_type"""
+    return TERRAIN_TABLE[terrain, cathegory]
+
+
+def find_majority(squares: np.ndarray) -> np.ndarray:
+    """Returns the most common value along the last axis.
+    Ties are won by the value found first along that axis"""
+    size = squares.shape[-1]
+    best_score = np.full(squares.shape[:-1], -1, dtype=np.int64)
+    result = np.zeros(squares.shape[:-1], dtype=squares.dtype)
+
+    for value in np.unique(squares):
+        match = squares == value
+        # A higher count always wins. Equal counts are settled by the first match
+        score = np.count_nonzero(match, axis=-1) * size \
+            + (size - 1 - match.argmax(axis=-1))
+        better = score > best_score
+        best_score[better] = score[better]
+        result[better] = value
+    return result
+
+
+def get_squares(values: np.ndarray, block: int,
+                rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """Returns the block x block squares at the given square coordinates.
+    Returns an array indexed by (square, index within square),
+    where each square is scanned column by column"""
+    height = values.shape[0] // block
+    length = values.shape[1] // block
+    squares = values.reshape(height, block, length, block)[rows, :, columns, :]
+    return squares.transpose(0, 2, 1).reshape(len(rows), block * block)
+
+
+def downsample(values: np.ndarray, block: int,
+               rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """Returns the most common value within each block x block square
+    at the given square coordinates"""
+    return find_majority(get_squares(values, block, rows, columns))
+
+
+def shift(values: np.ndarray, dx: int, dy: int, fill=0) -> np.ndarray:
+    """Returns values moved dx cells east and dy cells south.
+    Values wrap around horizontally. Rows moved in from beyond the poles get the fill value"""
+    result = np.roll(values, dx, axis=1)
+
+    if dy > 0:
+        result[dy:] = result[:-dy].copy()
+        result[:dy] = fill
+    elif dy < 0:
+        result[:dy] = result[-dy:].copy()
+        result[dy:] = fill
+    return result
+
+
+def dilate(mask: np.ndarray) -> np.ndarray:
+    """Returns a mask which is also true next to, or diagonally next to, true cells"""
+    result = mask.copy()
+
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            if dx != 0 or dy != 0:
+                result |= shift(mask, dx, dy, False)
+    return result
+
+
+def find_distances(passable: np.ndarray, seeds: np.ndarray,
+                   labels: np.ndarray = None) -> np.ndarray:
+    """Returns the amount of steps from the nearest seed, moving through passable cells.
+    Diagonal steps count as one step. Cells wrap around horizontally, but not across the poles.
+    If labels are given, steps only connect cells with the same label.
+    Unreachable cells get distance -1"""
+    height, length = passable.shape
+    passable = passable.reshape(-1)
+    if labels is not None:
+        labels = labels.reshape(-1)
+    distances = np.full(height * length, -1, dtype=np.int32)
+    frontier = np.flatnonzero(seeds)
+    distances[frontier] = 0
+    distance = 0
+
+    while len(frontier) > 0:
+        distance += 1
+        rows, columns = np.divmod(frontier, length)
+        if labels is not None:
+            frontier_labels = labels[frontier]
+        reached = []
+
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                if dx == 0 and dy == 0:
+                    continue
+                inside = (rows + dy >= 0) & (rows + dy < height)
+                neighbors = (rows[inside] + dy) * length + (columns[inside] + dx) % length
+                allowed = passable[neighbors] & (distances[neighbors] == -1)
+                if labels is not None:
+                    allowed &= labels[neighbors] == frontier_labels[inside]
+                neighbors = neighbors[allowed]
+                # Neighbors are unique within one direction, and marked before the next
+                distances[neighbors] = distance
+                reached.append(neighbors)
+
+        frontier = np.concatenate(reached)
+    return distances.reshape(height, length)
+
+
+class LayerStore():
+    """Stores the variables of every region in a grid.
+    Each variable is kept in its own array, indexed by (y, x)"""
+
+    def __init__(self, length: int, height: int, metrics: list[RegionMetrics],
+                 tile_size: int = 1):
+        """Creates layers for a grid of length x height regions.
+        Metrics holds the shared region metrics of each latitude.
+        Edits are tracked in square tiles of the given size"""
+        shape = (height, length)
+
+        self.length: int = length
+        self.height: int = height
+        self.metrics: list[RegionMetrics] = metrics
+        self.tile_size: int = tile_size
+
+        tile_shape = (height // tile_size, length // tile_size)
+        # Tiles with edits that haven't been applied to other grids, indexed by (tile y, tile x)
+        self.dirty_tiles = np.zeros(tile_shape, dtype=bool)
+        # Edit counter of each tile, indexed by (tile y, tile x)
+        self.tile_versions = np.zeros(tile_shape, dtype=np.int64)
+
+        # Metrics as arrays, indexed by y
+        self.area = np.array([row.area for row in metrics], dtype=np.int64)
+        self.cost = np.array([row.cost for row in metrics], dtype=np.float64)
+
+        self.terrain = np.full(shape, constants.WATER, dtype=np.uint8)
+        self.update_subdivision = np.zeros(shape, dtype=bool)
+
+        # Plate belonging
+        self.plate = np.full(shape, -1, dtype=np.int16)
+
+        # Variables used by plate
+        self.plate_x = np.zeros(shape, dtype=np.int32)
+        self.plate_y = np.zeros(shape, dtype=np.int32)
+        self.border_distance = np.full(shape, -1, dtype=np.int16)
+        self.active = np.ones(shape, dtype=bool)
+
+        self.horizontal_land_check = np.zeros(shape, dtype=bool)
+        self.vertical_land_check = np.zeros(shape, dtype=bool)
+        self.ascending_land_check = np.zeros(shape, dtype=bool)
+        self.descending_land_check = np.zeros(shape, dtype=bool)
+
+        # Sides bordering a different plate, packed as BOUNDARY_BITS
+        self.boundary = np.zeros(shape, dtype=np.uint8)
+        # Counter of boundary searches
+        self.boundary_version: int = 0
+
+        # Edit counter of the plate layer
+        self.plate_version: int = 0
+        # Flat indexes y * length + x of cells whose plate or activity changed,
+        # recorded one by one or in arrays, while recording is on. See pop_plate_changes
+        self.recording_changes: bool = False
+        self.changed_cells: list[int] = []
+        self.changed_arrays: list[np.ndarray] = []
+        # Border distances by (plate id, external terrain), see get_border_distance
+        self.distance_cache: dict[tuple[int, int],
+                                  tuple[int, np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    def find_boundaries(self) -> None:
+        """Finds the sides of each cell bordering a different plate.
+        Cells wrap around horizontally, but not across the poles"""
+        plate = self.plate
+        east = plate != np.roll(plate, -1, axis=1)
+        south = plate[:-1] != plate[1:]
+
+        boundary = east * np.uint8(BOUNDARY_BITS[constants.EAST])
+        boundary |= np.roll(east, 1, axis=1) * np.uint8(BOUNDARY_BITS[constants.WEST])
+        boundary[:-1] |= south * np.uint8(BOUNDARY_BITS[constants.SOUTH])
+        boundary[1:] |= south * np.uint8(BOUNDARY_BITS[constants.NORTH])
+        self.boundary = boundary
+        self.boundary_version += 1
+
+    def get_boundary_cells(self) -> dict[int, np.ndarray]:
+        """Returns the flat indexes y * length + x of all cells at a plate boundary,
+        grouped by plate id"""
+        cells = np.flatnonzero(self.boundary)
+        plates = self.plate.reshape(-1)[cells]
+        order = np.argsort(plates, kind="stable")
+        ids, starts = np.unique(plates[order], return_index=True)
+        return {int(id): group for id, group in zip(ids, np.split(cells[order], starts[1:]))}
+
+    def get_border_distance(self, plate_id: int, external_terrain: int) -> np.ndarray:
+        """Returns the distance from each region of a plate to the nearest region beyond the plate
+        with the given external terrain. Regions next to such a region have distance 1.
+        Regions outside the plate, or without a path to the border, have distance -1.
+        Distances are cached until the plate layer, or the terrain around the plate, is edited.
+        At most DISTANCE_CACHE_BYTES of distances are cached"""
+        key = (plate_id, external_terrain)
+        plate_mask = self.plate == plate_id
+
+        if key in self.distance_cache:
+            version, ring, ring_terrain, distances = self.distance_cache[key]
+            if version == self.plate_version \
+                    and np.array_equal(self.terrain.reshape(-1)[ring], ring_terrain):
+                return distances
+
+        claimed = plate_mask & ~self.active
+        outside = ~plate_mask & self.get_type_mask(external_terrain)
+        distances = find_distances(plate_mask, claimed & dilate(outside))
+        distances[distances >= 0] += 1
+
+        # Distances only depend on the plate, and the terrain of the regions around it
+        ring = np.flatnonzero(dilate(plate_mask) & ~plate_mask)
+        self.distance_cache.pop(key, None)
+        self.distance_cache[key] = (self.plate_version, ring,
+                                    self.terrain.reshape(-1)[ring], distances)
+
+        # The oldest distances are dropped first
+        while len(self.distance_cache) > 1 \
+                and self._get_distance_cache_bytes() > DISTANCE_CACHE_BYTES:
+            del self.distance_cache[next(iter(self.distance_cache))]
+        return distances
+
+    def _get_distance_cache_bytes(self) -> int:
+        """Returns the size of the cached border distances, with their rings"""
+        return sum(ring.nbytes + ring_terrain.nbytes + distances.nbytes
+                   for version, ring, ring_terrain, distances in self.distance_cache.values())
+
+    def get_plate_border(self, external_terrain: int) -> np.ndarray:
+        """Returns a mask of the cells next to, or diagonally next to,
+        a cell of another plate with the given terrain"""
+        external = self.get_type_mask(external_terrain)
+        border = np.zeros(external.shape, dtype=bool)
+
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                if dx != 0 or dy != 0:
+                    # Rows beyond the poles are never external
+                    border |= shift(external, dx, dy, False) \
+                        & (shift(self.plate, dx, dy, -1) != self.plate)
+        return border
+
+    def get_border_distances(self, external_terrain: int) -> np.ndarray:
+        """Returns the distance from each region to the nearest region of another plate
+        with the given external terrain, moving within the plate of the region.
+        Same as get_border_distance, for the regions of every plate at once"""
+        claimed = (self.plate >= 0) & ~self.active
+        seeds = claimed & self.get_plate_border(external_terrain)
+        distances = find_distances(self.plate >= 0, seeds, self.plate)
+        distances[distances >= 0] += 1
+        return distances
+
+    def set_terrain(self, mask: np.ndarray, terrain: int, set_update_flag: bool = True) -> None:
+        """Sets the terrain of all cells where mask is true, and records the edit.
+        Array version of Region.set_terrain"""
+        rows, columns = np.nonzero(mask)
+        self.terrain[rows, columns] = terrain
+        self.update_subdivision[rows, columns] = set_update_flag
+        self.mark_dirty_cells(rows, columns)
+
+    def set_terrain_cells(self, rows: np.ndarray, columns: np.ndarray, terrain: np.ndarray,
+                          set_update_flag: bool = True) -> None:
+        """Sets the terrain of each cell at (rows, columns) to the matching terrain,
+        and records the edit"""
+        self.terrain[rows, columns] = terrain
+        self.update_subdivision[rows, columns] = set_update_flag
+        self.mark_dirty_cells(rows, columns)
+
+    def mark_dirty(self, x: int, y: int) -> None:
+        """Marks the tile containing (x, y) as edited"""
+        self.dirty_tiles[y // self.tile_size, x // self.tile_size] = True
+        self.tile_versions[y // self.tile_size, x // self.tile_size] += 1
+
+    def mark_dirty_cells(self, rows: np.ndarray, columns: np.ndarray) -> None:
+        """Marks all tiles containing the cells at (rows, columns) as edited"""
+        edited = np.zeros(self.tile_versions.shape, dtype=bool)
+        edited[rows // self.tile_size, columns // self.tile_size] = True
+        self.dirty_tiles |= edited
+        self.tile_versions += edited
+
+    def mark_all_dirty(self) -> None:
+        """Marks every tile as edited"""
+        self.dirty_tiles[:] = True
+        self.tile_versions += 1
+
+    def pop_dirty_tiles(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the rows and columns of all edited tiles and clears the edit record"""
+        rows, columns = np.nonzero(self.dirty_tiles)
+        self.dirty_tiles[:] = False
+        return (rows, columns)
+
+    def record_plate_change(self, x: int, y: int) -> None:
+        """Records that the plate or activity of the cell at (x, y) changed,
+        if recording is on"""
+        if self.recording_changes:
+            self.changed_cells.append(y * self.length + x)
+
+    def record_plate_changes(self, cells: np.ndarray) -> None:
+        """Records that the plate or activity of cells, given as flat indexes, changed,
+        if recording is on"""
+        if self.recording_changes:
+            self.changed_arrays.append(cells)
+
+    def pop_plate_changes(self) -> np.ndarray:
+        """Returns the flat indexes of all cells with a changed plate or activity,
+        and clears the record. Cells changed several times may be repeated"""
+        cells = np.concatenate(
+            self.changed_arrays + [np.array(self.changed_cells, dtype=np.int64)])
+        self.changed_cells.clear()
+        self.changed_arrays.clear()
+        return cells
+
+    def get_tile_version(self, tile_x: int, tile_y: int) -> int:
+        """Returns the edit counter of a tile"""
+        return int(self.tile_versions[tile_y, tile_x])
+
+    def get_type_mask(self, cathegory: int) -> np.ndarray:
+        """Returns a boolean array, which is true where terrain belongs to the given cathegory"""
+        return get_type_mask(self.terrain, cathegory)
+
+    def get_area(self, mask: np.ndarray) -> int:
+        """Returns the total area of all regions where mask is true"""
+        return int(np.count_nonzero(mask, axis=1) @ self.area)
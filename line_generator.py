@@ -1,4 +1,6 @@
+from walk import Walk
 from typing import Self
+import numpy as np
 import random
 import constants
 
@@ -11,8 +13,13 @@ class LineGenerator():
     In other words, it's a cell offset by 0.5 length x and 0.5 height y."""
 
     def __init__(self, x: int, y: int, length: int, height: int,
-                 entrance: int, exit: int):
-        """Creates a line generator cell at x, y"""
+                 entrance: int, exit: int, rng: random.Random = None):
+        """Creates a line generator cell at x, y.
+        Randomness is drawn from rng, or from an unseeded stream if rng is None"""
+        if rng is None:
+            rng = random.Random()
+
+        self.rng: random.Random = rng
         self.x = x
         self.y = y
         self.length = length
@@ -27,10 +34,15 @@ class LineGenerator():
         self.end_y = -1
         self.post_x = -1
         self.post_y = -1
-        self.forward_walk: list[tuple[int]] = []
-        self.backward_walk: list[tuple[int]] = []
+        self.forward_walk: Walk = Walk()
+        self.backward_walk: Walk = Walk()
         self.grid: list[list[int]] = []
 
+        # Statistics of the latest random walk
+        self.steps: int = 0
+        self.backtracks: int = 0
+        self.restarts: int = 0
+
     def _within_center(self, x: int, y: int) -> bool:
         """Checks if a coordinate is in the grid, inside the frame"""
         return (1 <= x < self.length + 1) and (1 <= y < self.height + 1)
@@ -51,24 +63,24 @@ class LineGenerator():
         """Given an entrance or exit direction, generates start or end coordinates.
         Returns (start/end x, start/end y, prior/post x, prior/post y)"""
         if direction == constants.NORTH:
-            x = random.randrange(1, self.length + 1)
+            x = self.rng.randrange(1, self.length + 1)
             prior_x = x
             y = 1
             prior_y = 0
         elif direction == constants.EAST:
             x = self.length
             prior_x = self.length + 1
-            y = random.randrange(1, self.height + 1)
+            y = self.rng.randrange(1, self.height + 1)
             prior_y = y
         elif direction == constants.SOUTH:
-            x = random.randrange(1, self.length + 1)
+            x = self.rng.randrange(1, self.length + 1)
             prior_x = x
             y = self.height
             prior_y = self.height + 1
         elif direction == constants.WEST:
             x = 1
             prior_x = 0
-            y = random.randrange(1, self.height + 1)
+            y = self.rng.randrange(1, self.height + 1)
             prior_y = y
         return (x, y, prior_x, prior_y)
 
@@ -120,7 +132,7 @@ class LineGenerator():
         self.end_x, self.end_y = constants.get_next_coordinates(
             self.post_x, self.post_y, originator.entrance)
 
-    def _margin_check(self, step: tuple[int], walk: list[tuple[int]],
+    def _margin_check(self, step: tuple[int], walk: Walk,
                       margin: int, direction: int) -> bool:
         """Return true if the given step has sufficient margins
         to previous steps within the same walk.
@@ -142,7 +154,7 @@ class LineGenerator():
                     return False
             return True
 
-    def _completion_check(self, walk: list[tuple[int]], opposite: list[tuple[int]],
+    def _completion_check(self, walk: Walk, opposite: Walk,
                           directions: list[int]) -> bool:
         """Checks if a walk can reach the opposite walk within a single step.
         Adds that step to the walk and returns true.
@@ -157,22 +169,23 @@ class LineGenerator():
                 return True
         return False
 
-    def _next_step(self, walk: list[tuple[int]],
-                   opposite_walk: list[tuple[int]],
+    def _next_step(self, walk: Walk, opposite_walk: Walk,
                    margin: int, forbid_turn: bool,
-                   banned_direction: int) -> bool:
+                   banned_direction: int, backtrack_steps: int = 0) -> bool:
         """Adds a new position to a walk, so that the walk stays within the given bounds.
-        If no valid positions are found, both walk and opposite walk
+        If no valid positions are found, the walk backtracks, and the dead end is avoided
+        from then on. If the walk can't backtrack, both walk and opposite walk
         are cleared, except for their starting points. If walk reaches opposite walk,
         positions are removed from opposite walk until both walks can be joined to form
         a single path.
 
         Args:
-            walk: list of x,y-coordinates
-            opposite_walk: list of x,y-coordinates
+            walk: x,y-coordinates
+            opposite_walk: x,y-coordinates
             margin: walks minimum distance to self. 0: loops allowed. 1: loops forbidden. 2: no enclosed areas
             forbid_turn: ban walks moving directly away from exit direction
             banned_direction: direction banned by forbid_turn
+            backtrack_steps: amount of positions removed when backtracking. 0: never backtrack
         Returns:
             True if walk is completed and the two paths can be joined.
             False if walk was either successfully expanded upon or erased 
@@ -188,53 +201,71 @@ class LineGenerator():
         # for the purpose of completing the walk
         if margin == 2 and self._completion_check(walk, opposite_walk, options):
             last = walk[-1]
-            del opposite_walk[opposite_walk.index(last):]
+            opposite_walk.truncate(opposite_walk.index(last))
+            self.steps += 1
             return True
 
         while len(options) > 0:
-            dir = random.choice(options)
+            dir = self.rng.choice(options)
             options.remove(dir)
             next = constants.get_next_coordinates(x, y, dir)
 
             if next in opposite_walk:
                 walk.append(next)
-                del opposite_walk[opposite_walk.index(next):]
+                opposite_walk.truncate(opposite_walk.index(next))
+                self.steps += 1
                 return True
 
-            elif self._within_center(next[0], next[1]):
+            elif self._within_center(next[0], next[1]) and next not in walk.dead_ends:
                 if self._margin_check(next, walk, margin, dir):
                     walk.append(next)
+                    self.steps += 1
                     return False
 
-        del walk[2:]
-        del opposite_walk[2:]
+        # The starting points can't be removed
+        if backtrack_steps > 0 and len(walk) > 2:
+            walk.dead_ends.add(walk[-1])
+            walk.truncate(max(len(walk) - backtrack_steps, 2))
+            self.backtracks += 1
+            return False
+
+        walk.clear_from(2)
+        opposite_walk.clear_from(2)
+        self.restarts += 1
         return False
 
-    def random_walk(self, margin: int = 1, forbid_turn: bool = False) -> list[tuple]:
+    def random_walk(self, margin: int = 1, forbid_turn: bool = False,
+                    backtrack_steps: int = 0) -> list[tuple]:
         """Generates a random path from start to end coordinates.
-        The path will be free of loops"""
+        The path will be free of loops.
+        On dead ends, the walk backtracks the given amount of steps,
+        or starts over if backtrack steps is 0"""
+        self.steps = 0
+        self.backtracks = 0
+        self.restarts = 0
+
         if self.start_x == -1:
             self.generate_start()
         if self.end_x == -1:
             self.generate_end()
 
-        self.forward_walk = [(self.prior_x, self.prior_y),
-                             (self.start_x, self.start_y)]
-        self.backward_walk = [(self.post_x, self.post_y),
-                              (self.end_x, self.end_y)]
+        self.forward_walk = Walk([(self.prior_x, self.prior_y),
+                                  (self.start_x, self.start_y)])
+        self.backward_walk = Walk([(self.post_x, self.post_y),
+                                   (self.end_x, self.end_y)])
 
         while True:
             if self._next_step(self.forward_walk, self.backward_walk, margin,
-                               forbid_turn, constants.flip_direction(self.exit)):
+                               forbid_turn, constants.flip_direction(self.exit),
+                               backtrack_steps):
                 break
             if self._next_step(self.backward_walk, self.forward_walk, margin,
-                               forbid_turn, self.exit):
+                               forbid_turn, self.exit, backtrack_steps):
                 break
 
-        self.backward_walk.reverse()
-        self.forward_walk.extend(self.backward_walk)
+        self.forward_walk.extend(reversed(self.backward_walk.points))
         self.backward_walk.clear()
-        return self.forward_walk
+        return self.forward_walk.points
 
     def _fill_untouched(self, terrain: int) -> None:
         """Fills areas which hasn't yet been filled"""
@@ -244,15 +275,42 @@ class LineGenerator():
                     row[column] = terrain
 
     def _fill_terrain(self, x: int, y: int, terrain: int) -> None:
-        """Fills an area with a terrain"""
+        """Fills an area with a terrain.
+        The area is filled one horizontal span at a time, without recursion"""
         if self._within_boundaries(x, y) == False or self.grid[y][x] != -1:
             return
 
-        self.grid[y][x] = terrain
-        self._fill_terrain(x, y - 1, terrain)
-        self._fill_terrain(x + 1, y, terrain)
-        self._fill_terrain(x, y + 1, terrain)
-        self._fill_terrain(x - 1, y, terrain)
+        last_x = self.length + 1
+        last_y = self.height + 1
+        spans = [(x, y)]
+
+        while len(spans) > 0:
+            x, y = spans.pop()
+            row = self.grid[y]
+            if row[x] != -1:
+                continue
+
+            west = x
+            while west > 0 and row[west - 1] == -1:
+                west -= 1
+            east = x
+            while east < last_x and row[east + 1] == -1:
+                east += 1
+            row[west:east + 1] = [terrain] * (east - west + 1)
+
+            # Every unfilled span next to the filled span gets filled later
+            for next_y in (y - 1, y + 1):
+                if next_y < 0 or next_y > last_y:
+                    continue
+                next_row = self.grid[next_y]
+                in_span = False
+
+                for next_x in range(west, east + 1):
+                    if next_row[next_x] != -1:
+                        in_span = False
+                    elif not in_span:
+                        spans.append((next_x, next_y))
+                        in_span = True
 
     def _strip_grid(self):
         """Removes the outer elements of the grid"""
@@ -283,6 +341,8 @@ class LineGenerator():
             fill_remains:
                 if true, fills unpainted areas with primary terrain.
                 Handles areas the fill algorithm missed"""
+        # Painting again starts over on an empty grid
+        self.grid.clear()
         for row in range(self.height + 2):
             self.grid.append([-1 for column in range(self.length + 2)])
 
@@ -327,11 +387,23 @@ class LineGenerator():
         self.forward_walk.clear()
         self.backward_walk.clear()
         self.grid.clear()
+        self.steps = 0
+        self.backtracks = 0
+        self.restarts = 0
+
+    def get_statistics(self) -> dict[str, int]:
+        """Returns the amount of steps taken, backtracks and restarts of the latest random walk"""
+        return {"steps": self.steps, "backtracks": self.backtracks, "restarts": self.restarts}
 
     def get_terrain_grid(self) -> list[list[int]]:
         """Returns the terrain grid"""
         return self.grid
 
+    def get_terrain_array(self) -> np.ndarray:
+        """Returns the terrain grid as an array indexed by (y, x).
+        Unpainted cells are -1"""
+        return np.array(self.grid, dtype=np.int16).reshape(-1, self.length)
+
     def get_terrain(self, x: int, y: int) -> int:
         """Gets the terrain at (x, y)"""
         return self.grid[y][x]
@@ -1,7 +1,9 @@
 from PyQt5 import QtGui, QtWidgets
-from PyQt5.QtCore import QEvent, QTimer, Qt
+from PyQt5.QtCore import QEvent, QRect, QTimer
 from PyQt5.QtGui import QColor
 from world import World
+from kilometer_map import KilometerMap
+from generation import GenerationSettings
 from plate_options import PlateOptions
 from continent_options import ContinentOptions
 from boundary_options import BoundaryOptions
@@ -10,7 +12,12 @@ from tool_info import ToolInfo
 from toolbar import Toolbar
 from region import Region
 from plate import Plate
+from layers import BOUNDARY_BITS, TERRAIN_COUNT, get_type_mask, shift
+from renderer import Compositor, PixelImage, create_palette, create_sprite
 import constants
+import numpy as np
+import os
+import time
 
 
 class Main(QtWidgets.QMainWindow):
@@ -33,6 +40,18 @@ class Main(QtWidgets.QMainWindow):
                     QColor(255, 87, 34), QColor(255, 138, 101),
                     QColor(255, 152, 0), QColor(255, 183, 77)]
 
+    # Pixel values of each plate color, followed by black for unclaimed regions
+    PLATE_PALETTE = create_palette(dict(enumerate(PLATE_COLORS)), len(PLATE_COLORS) + 1)
+    # Pixel values of each terrain
+    TERRAIN_PALETTE = create_palette(constants.COLORS, TERRAIN_COUNT)
+    # Details of subregions with a terrain, facing a surrounding terrain:
+    # (terrain, surrounding terrain, edge terrain, edge width, corner terrain, corner width)
+    DETAILS = [(constants.LAND, constants.WATER, constants.SHORE, 2, constants.SHALLOWS, 2),
+               (constants.WATER, constants.LAND, constants.SHALLOWS, 2, constants.SHORE, 2),
+               (constants.MOUNTAIN, constants.FLATLAND, constants.CLIFFS, 1, constants.LAND, 2)]
+    # Seconds of plate growth steps to run in each animation frame, before the plates are painted
+    GROWTH_FRAME_TIME = 0.04
+
     # Pixel size of region on world map
     REGION_SIZE: int = 24
     # Amount of regions in grid
@@ -80,6 +99,14 @@ class Main(QtWidgets.QMainWindow):
         self.world_map = QtGui.QPixmap(1440, 720)
         self.world_map.fill(constants.get_color(constants.WATER))
         self.screen.setPixmap(self.world_map)
+        # Cached map layers, composited on the world map
+        self.compositor = Compositor(1440, 720)
+        # Plates painted during plate growth, see paint_plates
+        self.plate_image: PixelImage = None
+        # Whether the screen shows the world map, as last drawn by the compositor
+        self.map_shown = False
+        # Pixels of subregion details, see get_detail_sprite
+        self.detail_sprites: dict[tuple, tuple[np.ndarray, np.ndarray]] = {}
         self.map_layout.addWidget(self.screen)
 
         # Options under the map
@@ -122,164 +149,158 @@ class Main(QtWidgets.QMainWindow):
 
         self.view_world_info()
 
-    def paint_plates(self):
-        """Paints tectonic plates. Unclaimed regions are painted black"""
-        painter = QtGui.QPainter(self.screen.pixmap())
-        pen = QtGui.QPen()
-        painter.fillRect(0, 0, 1440, 720, Qt.black)
-
+    def paint_plates(self, cells: np.ndarray = None):
+        """Paints tectonic plates. Unclaimed regions are painted black.
+        If cells are given, as flat indexes y * length + x, only they are painted again"""
         if self.precision == constants.SUBREGION:
-            length = self.world.sub_length
+            layers = self.world.subregion_layers
         else:
-            length = self.world.length
+            layers = self.world.region_layers
+
+        image = self.plate_image
+        if cells is None or image is None \
+                or (image.length, image.height) != (layers.length, layers.height):
+            image = self.plate_image = PixelImage(layers.length, layers.height)
+            cells = np.arange(layers.length * layers.height)
+        if len(cells) == 0:
+            return
+
+        # Claimed regions get the first color of a plate, queued regions the second
+        plate = layers.plate.reshape(-1)[cells]
+        active = layers.active.reshape(-1)[cells]
+        colors = np.where(plate >= 0, (plate * 2 + active) % len(Main.PLATE_COLORS),
+                          len(Main.PLATE_COLORS))
+        image.pixels.reshape(-1)[cells] = Main.PLATE_PALETTE[colors]
+
+        # Only the rows with painted cells are drawn
+        rows = cells // layers.length
+        source = QRect(0, int(rows.min()), layers.length, int(rows.max() - rows.min()) + 1)
 
-        point = 1440 // length
-        pen.setWidth(point)
-
-        for plate in self.world.plates:
-            pen.setColor(Main.PLATE_COLORS[plate.id * 2])
-            painter.setPen(pen)
-
-            for region in plate.claimed_regions:
-                painter.drawPoint(point//2 + region.x*point,
-                                  point//2 + region.metrics.y*point)
+        painter = QtGui.QPainter(self.screen.pixmap())
+        drawn = image.draw(painter, scale=1440 // layers.length, source=source)
+        painter.end()
+        self.map_shown = False
+        self.screen.update(drawn)
 
-            pen.setColor(Main.PLATE_COLORS[plate.id * 2 + 1])
-            painter.setPen(pen)
+    def get_detail_sprite(self, dir: int, width: int, corner: bool) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the pixels of a subregion edge or corner facing the given direction,
+        painted with the given pen width. See renderer.create_sprite"""
+        size = 1440 // self.world.sub_length
+        key = (dir, width, corner, size)
 
-            for region in plate.queued_regions:
-                painter.drawPoint(point//2 + region.x*point,
-                                  point//2 + region.metrics.y*point)
-        painter.end()
-        self.update()
+        if key not in self.detail_sprites:
+            pen = QtGui.QPen()
+            pen.setWidth(width)
 
-    def paint_edges(self, painter: QtGui.QPainter, x: int, y: int,
-                    regions: list[Region], surrounding_terrain: int,
-                    edge_color: QColor, width: int = 1) -> None:
-        """Paints the edges of a subregion in the edge color
-        if the subregion borders to the given terrain"""
+            def paint(painter: QtGui.QPainter) -> None:
+                painter.setPen(pen)
+                if corner:
+                    painter.drawPoint(*constants.get_corner(dir, size))
+                else:
+                    painter.drawRect(*constants.get_side(dir, width, size))
 
-        size = 1440 // self.world.sub_length
-        pen = QtGui.QPen()
-        pen.setWidth(width)
-        pen.setColor(edge_color)
-        painter.setPen(pen)
+            self.detail_sprites[key] = create_sprite(paint, size)
+        return self.detail_sprites[key]
 
-        for dir in range(1, 8, 2):
-            if regions[dir] is not None and \
-                    constants.is_type(regions[dir].terrain, surrounding_terrain):
-                coordinates = constants.get_side(dir, width)
-                painter.drawRect(x * size + coordinates[0], y * size + coordinates[1],
-                                 coordinates[2], coordinates[3])
-
-    def paint_corners(self, painter: QtGui.QPainter, x: int, y: int,
-                      regions: list[Region], surrounding_terrain: int,
-                      corner_color: QColor, corner_width: int = 1):
-        """Paints the corner of a subregion in the corner color
-        if the subregion borders to the given terrain on two sides"""
-        size = 1440 // self.world.sub_length
-        corner_pen = QtGui.QPen()
-        corner_pen.setWidth(corner_width)
-        corner_pen.setColor(corner_color)
-        painter.setPen(corner_pen)
-
-        for dir in range(1, 8, 2):
-            next_dir = (dir + 2) % 8
-            if regions[dir] is not None and regions[next_dir] is not None and \
-                constants.is_type(regions[dir].terrain, surrounding_terrain) and \
-                    constants.is_type(regions[next_dir].terrain, surrounding_terrain):
-                coordinates = constants.get_corner(dir + 1)
-                painter.drawPoint(x*size + coordinates[0],
-                                  y*size + coordinates[1])
-
-    def paint_plate_borders(self) -> None:
+    def paint_plate_borders(self, painter: QtGui.QPainter) -> None:
         """Paints plate borders"""
         point = 1440 // self.world.sub_length
-        painter = QtGui.QPainter(self.screen.pixmap())
         outliner = QtGui.QPen()
         outliner.setWidth(1)
         outliner.setColor(constants.PLATE_BORDER_COLOR)
         painter.setPen(outliner)
 
-        for row in self.world.subregions:
-            for subregion in row:
-                if subregion.east_boundary:
-                    painter.drawLine((subregion.x + 1) * point - 1,
-                                     subregion.metrics.y * point,
-                                     (subregion.x + 1) * point - 1,
-                                     (subregion.metrics.y + 1) * point - 1)
-
-                if subregion.south_boundary:
-                    painter.drawLine(subregion.x * point,
-                                     (subregion.metrics.y + 1) * point - 1,
-                                     (subregion.x + 1) * point - 1,
-                                     (subregion.metrics.y + 1) * point - 1)
-        painter.end()
-
-    def paint_world(self) -> None:
-        """Paints regions or subregions"""
-        painter = QtGui.QPainter(self.screen.pixmap())
-        pen = QtGui.QPen()
-        map = self.world.get_subregions_by_terrain()
-        point = 1440 // self.world.sub_length
-        pen.setWidth(point)
-
-        for terrain, regions in map.items():
-            pen.setColor(constants.get_color(terrain))
-            painter.setPen(pen)
-
-            for region in regions:
-                painter.drawPoint(point//2 + region.x*point,
-                                  point//2 + region.metrics.y*point)
-        painter.end()
-
-    def paint_details(self):
-        painter = QtGui.QPainter(self.screen.pixmap())
-
-        for row in self.world.subregions:
-            for subregion in row:
-                coordinates = constants.get_surroundings(
-                    subregion.x, subregion.metrics.y,
-                    self.world.sub_length, self.world.sub_height)
-                surroundings = self.world.get_all_subregions(coordinates)
-
-                if subregion.terrain == constants.LAND:
-                    self.paint_edges(painter, subregion.x, subregion.metrics.y,
-                                     surroundings, constants.WATER,
-                                     edge_color=constants.get_color(
-                                         constants.SHORE),
-                                     width=2)
-                    self.paint_corners(painter, subregion.x, subregion.metrics.y,
-                                       surroundings, constants.WATER,
-                                       constants.get_color(constants.SHALLOWS),
-                                       2)
-                elif subregion.terrain == constants.WATER:
-                    self.paint_edges(painter, subregion.x, subregion.metrics.y,
-                                     surroundings, constants.LAND,
-                                     edge_color=constants.get_color(
-                                         constants.SHALLOWS),
-                                     width=2)
-                    self.paint_corners(painter, subregion.x, subregion.metrics.y,
-                                       surroundings, constants.LAND,
-                                       corner_color=constants.get_color(
-                                           constants.SHORE),
-                                       corner_width=2)
-                elif subregion.terrain == constants.MOUNTAIN:
-                    self.paint_edges(painter, subregion.x, subregion.metrics.y,
-                                     surroundings, constants.FLATLAND,
-                                     edge_color=constants.get_color(
-                                         constants.CLIFFS),
-                                     width=1)
-                    self.paint_corners(painter, subregion.x, subregion.metrics.y,
-                                       surroundings, constants.FLATLAND,
-                                       corner_color=constants.get_color(
-                                           constants.LAND),
-                                       corner_width=2)
-        painter.end()
+        subregion_layers = self.world.subregion_layers
+        east_bit = BOUNDARY_BITS[constants.EAST]
+        south_bit = BOUNDARY_BITS[constants.SOUTH]
 
-    def paint_lines(self):
+        for plate in self.world.plates:
+            cells = plate.boundary_cells
+            boundary = subregion_layers.boundary.reshape(-1)[cells]
+            rows, columns = np.divmod(cells, self.world.sub_length)
+
+            for y, x, sides in zip(rows.tolist(), columns.tolist(), boundary.tolist()):
+                if sides & east_bit:
+                    painter.drawLine((x + 1) * point - 1, y * point,
+                                     (x + 1) * point - 1, (y + 1) * point - 1)
+
+                if sides & south_bit:
+                    painter.drawLine(x * point, (y + 1) * point - 1,
+                                     (x + 1) * point - 1, (y + 1) * point - 1)
+
+    def get_clip_cells(self, painter: QtGui.QPainter) -> tuple[range, range]:
+        """Returns the rows and columns of the subregions covered by the clip rectangle
+        of the painter, or of every subregion if the painter doesn't clip"""
+        layers = self.world.subregion_layers
+        size = 1440 // layers.length
+
+        if not painter.hasClipping():
+            return (range(layers.height), range(layers.length))
+
+        rect = painter.clipBoundingRect().toAlignedRect() & QRect(0, 0, 1440, 720)
+        return (range(rect.top() // size, rect.bottom() // size + 1),
+                range(rect.left() // size, rect.right() // size + 1))
+
+    def paint_world(self, painter: QtGui.QPainter) -> None:
+        """Paints the subregions within the clip rectangle of the painter"""
+        layers = self.world.subregion_layers
+        size = 1440 // layers.length
+        rows, columns = self.get_clip_cells(painter)
+
+        image = PixelImage(len(columns), len(rows))
+        image.pixels[:] = Main.TERRAIN_PALETTE[
+            layers.terrain[rows.start:rows.stop, columns.start:columns.stop]]
+        image.draw(painter, columns.start * size, rows.start * size, scale=size)
+
+    def paint_details(self, painter: QtGui.QPainter):
+        """Paints the edges and corners of subregions facing other terrain,
+        within the clip rectangle of the painter. Subregions beyond the poles are left out"""
+        layers = self.world.subregion_layers
+        size = 1440 // layers.length
+        rows, columns = self.get_clip_cells(painter)
+
+        # Details reach up to one subregion outside their own, so the subregions around
+        # the clip rectangle are stamped too, and their neighbours are looked at
+        y = np.arange(rows.start - 2, rows.stop + 2)
+        x = np.arange(columns.start - 2, columns.stop + 2)
+        valid_rows = ((y >= 0) & (y < layers.height))[:, np.newaxis]
+        terrain = layers.terrain[np.clip(y, 0, layers.height - 1)][:, x % layers.length]
+
+        # Subregions are stamped in the same order as on the whole map,
+        # so subregions wrapped around from the other side are left out
+        stamped = np.zeros(terrain.shape, dtype=bool)
+        stamped[1:-1, 1:-1] = True
+        stamped &= valid_rows & (x >= 0) & (x < layers.length)
+        stamps = []
+
+        for cell_terrain, surrounding, edge, edge_width, corner, corner_width in Main.DETAILS:
+            selection = stamped & (terrain == cell_terrain)
+            surrounded = get_type_mask(terrain, surrounding) & valid_rows
+            # Where the neighbour in each direction has the surrounding terrain.
+            # Wrong on the outermost subregions, which aren't stamped
+            neighbors = {}
+
+            for dir in range(1, 8, 2):
+                dx, dy = constants.get_next_coordinates(0, 0, dir)
+                neighbors[dir] = shift(surrounded, -dx, -dy, False)
+
+            for dir in range(1, 8, 2):
+                stamps.append((selection & neighbors[dir],
+                               self.get_detail_sprite(dir, edge_width, False),
+                               constants.get_color(edge).rgba()))
+
+            for dir in range(1, 8, 2):
+                next_dir = (dir + 2) % 8
+                stamps.append((selection & neighbors[dir] & neighbors[next_dir],
+                               self.get_detail_sprite(dir + 1, corner_width, True),
+                               constants.get_color(corner).rgba()))
+
+        image = PixelImage(len(x) * size, len(y) * size)
+        image.stamp(stamps, size)
+        image.draw(painter, int(x[0]) * size, int(y[0]) * size)
+
+    def paint_lines(self, painter: QtGui.QPainter):
         """Draws lines at -60, -30, 0, 30, 60 latitude and -90, 0, 90 longitude"""
-        painter = QtGui.QPainter(self.screen.pixmap())
         pen = QtGui.QPen()
         pen.setColor(constants.LINE_COLOR)
         painter.setPen(pen)
@@ -291,11 +312,9 @@ class Main(QtWidgets.QMainWindow):
         painter.drawLine(360, 0, 360, 720)
         painter.drawLine(720, 0, 720, 720)
         painter.drawLine(1080, 0, 1080, 720)
-        painter.end()
 
-    def paint_grid(self):
+    def paint_grid(self, painter: QtGui.QPainter):
         """Draws region grid"""
-        painter = QtGui.QPainter(self.screen.pixmap())
         pen = QtGui.QPen()
         pen.setColor(constants.GRID_COLOR)
         painter.setPen(pen)
@@ -306,11 +325,10 @@ class Main(QtWidgets.QMainWindow):
         for y in range(0, 720, Main.REGION_SIZE):
             painter.drawLine(0, y, 1440, y)
 
-        painter.end()
-
     def paint_coastline(self, coastline: list[Region]):
         """Paints all regions in the coastline with diagonal lines"""
         painter = QtGui.QPainter(self.screen.pixmap())
+        self.map_shown = False
         pen = QtGui.QPen()
         pen.setColor(constants.PLATE_BORDER_COLOR)
         painter.setPen(pen)
@@ -326,7 +344,7 @@ class Main(QtWidgets.QMainWindow):
                              (region.metrics.y + 1) * Main.REGION_SIZE - 1)
         painter.end()
 
-    def paint_square_mile_lines(self, map: dict[list[str, int]]):
+    def paint_square_mile_lines(self, map: KilometerMap):
         painter = QtGui.QPainter(self.screen.pixmap())
         pen = QtGui.QPen()
         pen.setColor(constants.LINE_COLOR)
@@ -340,14 +358,13 @@ class Main(QtWidgets.QMainWindow):
         # for y in range(Main.SQUARE_KM_START_Y, 720, vertical):
         #     painter.drawLine(0, y, 1440, y)
 
-        for i in range(len(map["x"])):
-            if map["subregion_border"][i]:
-                painter.drawPoint(720 + map["x"][i],
-                                  Main.SQUARE_KM_START_Y + map["y"][i])
+        for x, y in zip(map.x[map.subregion_border].tolist(),
+                        map.y[map.subregion_border].tolist()):
+            painter.drawPoint(720 + x, Main.SQUARE_KM_START_Y + y)
 
         painter.end()
 
-    def paint_square_mile_grid(self, map: dict[list[str, int]]):
+    def paint_square_mile_grid(self, map: KilometerMap):
         painter = QtGui.QPainter(self.screen.pixmap())
         pen = QtGui.QPen()
         pen.setColor(constants.GRID_COLOR)
@@ -362,45 +379,42 @@ class Main(QtWidgets.QMainWindow):
 
         painter.end()
 
-    def paint_region_map(self, map: dict[list]):
+    def paint_region_map(self, map: KilometerMap):
         """Paints all square kilometers of a region"""
-        painter = QtGui.QPainter(self.screen.pixmap())
-        painter.fillRect(0, 0, 1440, 720, QColor(0, 0, 0))
-        unique = set(map["terrain"])
+        image = PixelImage(1440, 720)
+        image.pixels[:] = QColor(0, 0, 0).rgba()
 
-        for terrain in unique:
-            pen = QtGui.QPen()
-            pen.setColor(constants.get_color(terrain))
-            pen.setWidth(1)
-            painter.setPen(pen)
-
-            for i in range(len(map["x"])):
-                if map["terrain"][i] == terrain:
-                    painter.drawPoint(720 + map["x"][i],
-                                      Main.SQUARE_KM_START_Y + map["y"][i])
+        x = 720 + map.x
+        y = Main.SQUARE_KM_START_Y + map.y
+        inside = np.flatnonzero((x >= 0) & (x < 1440) & (y >= 0) & (y < 720))
+        image.pixels[y[inside], x[inside]] = Main.TERRAIN_PALETTE[map.terrain[inside]]
+
+        painter = QtGui.QPainter(self.screen.pixmap())
+        image.draw(painter)
         painter.end()
+        self.map_shown = False
 
     def expand_plates(self):
-        """Expands plates by one growth step and paints the progress.
+        """Expands plates and paints the regions they claimed.
+        Runs as many growth steps as fit in one animation frame, then paints them at once.
         When finished, generates continents and paints the map"""
-        if self.world.expand_plates():
-            self.world.create_continents()
+        frame_start = time.perf_counter()
+        changes = []
 
-            if self.precision == constants.REGION:
-                self.world.update_subregions_from_regions()
-            else:
-                self.world.update_regions_from_subregions()
+        while True:
+            changes.append(self.world.expand_plates(record_changes=True))
 
-            self.world.find_plate_boundaries()
-            self.view_world_info()
-            self.view_continents()
+            if self.world.plates_expanded():
+                self.world.finish_plates(self.precision)
+                self.view_world_info()
+                self.view_continents()
+                return
+            if time.perf_counter() - frame_start >= Main.GROWTH_FRAME_TIME:
+                break
 
-        elif self.precision == constants.REGION:
-            self.paint_plates()
-            self.timer.singleShot(100, self.expand_plates)
-        elif self.precision == constants.SUBREGION:
-            self.paint_plates()
-            self.timer.singleShot(25, self.expand_plates)
+        self.paint_plates(np.concatenate(changes))
+        # Lets the window show the frame before the next one
+        self.timer.singleShot(0, self.expand_plates)
 
     def generate_world(self):
         """Generates tectonic plates and creats continents"""
@@ -408,40 +422,10 @@ class Main(QtWidgets.QMainWindow):
         self.plate_options.generate_button.setEnabled(False)
         self.toolbar.plate_generation_tool.setEnabled(False)
 
-        if self.plate_options.high_resolution.isChecked():
-            self.precision = constants.SUBREGION
-            world_map = self.world.subregions
-            min_growth = self.plate_options.min_growth.value()*4
-            max_growth = self.plate_options.max_growth.value()*4
-            super_growth = 32
-        else:
-            self.precision = constants.REGION
-            world_map = self.world.regions
-            min_growth = self.plate_options.min_growth.value()
-            max_growth = self.plate_options.max_growth.value()
-            super_growth = 8
-
-        if self.plate_options.supercontinent_toggle.isChecked():
-            supercontinents = 1
-        else:
-            supercontinents = 0
-
-        if self.plate_options.algorithm.currentText() == "Fixed growth":
-            fixed_growth = True
-        else:
-            fixed_growth = False
-
-        self.world.create_plates(
-            land_amount=self.plate_options.land_plates.value(),
-            water_amount=self.plate_options.sea_plates.value(),
-            margin=self.plate_options.plate_margin.value(),
-            island_rate=self.plate_options.island_rate.value(),
-            min_growth=min_growth,
-            max_growth=max_growth,
-            odd_amount=supercontinents,
-            odd_growth=super_growth,
-            world_map=world_map,
-            fixed_growth=fixed_growth)
+        settings = GenerationSettings.from_options(self.plate_options)
+        self.precision = settings.get_precision()
+        settings.create_plates(self.world)
+        self.plate_image = None
         self.timer.singleShot(200, self.expand_plates)
 
     def add_plate_type(self):
@@ -487,6 +471,14 @@ class Main(QtWidgets.QMainWindow):
 
         self.view_continents(detailed=False)
 
+    def create_all_mountains(self):
+        """Creates mountain ranges on every plate, where it meets another plate"""
+        options = self.continent_options
+        land_offset = (options.min_land_offset.value(), options.max_land_offset.value())
+        sea_offset = (options.min_offset.value(), options.max_offset.value())
+        self.world.create_mountains(land_offset=land_offset, sea_offset=sea_offset)
+        self.view_continents(detailed=False)
+
     def erase_mountains(self):
         """Removes all mountains from the selected plate"""
         for region in self.selected_plate.claimed_regions:
@@ -520,48 +512,71 @@ class Main(QtWidgets.QMainWindow):
     def select_coastline(self, region: Region):
         """Selects a coastline"""
         coastline = self.world.find_region_coastline(
-            region.x, region.metrics.y)
+            region.x, region.metrics.y, self.boundary_options.backtrack_steps.value())
+        if coastline is None:
+            return
         self.boundary_options.generate_button.setEnabled(True)
         self.view_continents(detailed=False)
         self.paint_coastline(coastline)
 
     def generate_coastline(self):
-        """Randomizes the selected coastline"""
-        self.world.generate_region_coastline()
+        """Randomizes the selected coastline.
+        Large coastlines are generated on every processor, see Boundary.generate"""
+        self.world.generate_region_coastline(workers=os.cpu_count() or 1)
         self.view_continents(detailed=False)
 
+    def get_overlays(self, plate_borders: bool = True) -> list[tuple]:
+        """Returns the checked map overlays, as layers for the compositor.
+        The grid and lines never change. Plate borders change when boundaries are found"""
+        overlays = []
+
+        if self.view_options.view_grid.isChecked():
+            overlays.append(("grid", 0, self.paint_grid))
+        if self.view_options.view_lines.isChecked():
+            overlays.append(("lines", 0, self.paint_lines))
+        if plate_borders and self.view_options.view_plate_borders.isChecked():
+            layers = self.world.subregion_layers
+            overlays.append(("plate borders", (layers, layers.boundary_version),
+                             self.paint_plate_borders))
+        return overlays
+
     def view_plates(self):
         """Paints the plates"""
         self.paint_plates()
-        if self.view_options.view_grid.isChecked():
-            self.paint_grid()
-        if self.view_options.view_lines.isChecked():
-            self.paint_lines()
+        painter = QtGui.QPainter(self.screen.pixmap())
+        self.compositor.draw(painter, self.get_overlays(plate_borders=False))
+        painter.end()
         self.update()
 
     def view_continents(self, detailed: bool = True):
-        """Paints the world map"""
+        """Paints the world map. Layers are only painted again where edited,
+        and only the edited part of the screen is updated"""
         self.zoom_level = constants.SUBREGION
-        self.paint_world()
+        layers = self.world.subregion_layers
+        size = 1440 // layers.length
+        map_layers = [("terrain", layers, self.paint_world,
+                       (layers.tile_versions, size * layers.tile_size, 0))]
 
         if detailed:
-            self.paint_details()
-        if self.view_options.view_grid.isChecked():
-            self.paint_grid()
-        if self.view_options.view_lines.isChecked():
-            self.paint_lines()
-        if self.view_options.view_plate_borders.isChecked():
-            self.paint_plate_borders()
-        self.update()
+            # Details depend on neighbours, so they change one subregion around edits
+            map_layers.append(("details", layers, self.paint_details,
+                               (layers.tile_versions, size * layers.tile_size, size)))
+
+        painter = QtGui.QPainter(self.screen.pixmap())
+        region = self.compositor.draw(painter, map_layers + self.get_overlays(),
+                                      partial=self.map_shown)
+        painter.end()
+        self.map_shown = True
+        self.screen.update(region)
 
     def view_square_kilometers(self):
         """Paints the region"""
-        self.paint_region_map(self.world.km_squares_dicts)
+        self.paint_region_map(self.world.km_map)
 
         if self.view_options.view_grid.isChecked():
-            self.paint_square_mile_grid(self.world.km_squares_dicts)
+            self.paint_square_mile_grid(self.world.km_map)
         if self.view_options.view_lines.isChecked():
-            self.paint_square_mile_lines(self.world.km_squares_dicts)
+            self.paint_square_mile_lines(self.world.km_map)
         self.update()
 
     def refresh_map(self):
@@ -588,6 +603,7 @@ Radius: {self.world.radius} km
 Land: {self.world.get_land_area():,} km2
 Sea: {sea_area:,} km2
 Sea percentage: {sea_area / self.world.area:.0%}
+Seed: {self.world.seed}
 """)
 
     def eventFilter(self, object, event):
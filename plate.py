@@ -1,15 +1,22 @@
-from region import Region
+from region import Region, RegionGrid
+from layers import LayerStore
+import numpy as np
 import random
 import math
 import constants
 
 
 class Plate():
-    def __init__(self, id: int, world_map: list[list[Region]], start_x: int, start_y: int,
+    def __init__(self, id: int, world_map: RegionGrid, start_x: int, start_y: int,
                  type: int = constants.CENTER, margin: float = 0.25, island_rate: float = 0.1,
-                 growth: int = 4, relative_growth: float = 0.3):
+                 growth: int = 4, relative_growth: float = 0.3, rng: random.Random = None):
+        if rng is None:
+            rng = random.Random()
+
         self.id: int = id
-        self.world_map: list[list[Region]] = world_map
+        self.rng: random.Random = rng
+        self.world_map: RegionGrid = world_map
+        self.layers: LayerStore = world_map.layers
         self.start_x: int = start_x
         self.start_y: int = start_y
         self.max_x = len(world_map[0])
@@ -26,8 +33,12 @@ class Plate():
         self.land_area: int = 0
         self.sea_area: int = 0
         self.pole_type: int = 0
-        self.claimed_regions: list[Region] = []
-        self.queued_regions: list[Region] = []
+        # Regions which the plate can expand from, as flat indexes y * max_x + x
+        # Queued regions are active. Claimed regions are those no longer active
+        self.frontier: list[int] = []
+        # Subregions at the plate boundary as flat indexes on the subregion grid,
+        # whatever grid the plate is on. Set by world.find_plate_boundaries
+        self.boundary_cells: np.ndarray = np.zeros(0, dtype=np.int64)
 
         # This keeps track of the plates boundaries
         # For a vertical line at y, store minimum and maximum x values
@@ -142,14 +153,18 @@ class Plate():
     def claim_region(self, x: int, y: int) -> None:
         """Claims a region. Updates plate boundaries and pays region cost"""
         ix, iy = self._get_coordinates(x, y)
-        region = self.world_map[iy][ix]
-        region.plate = self.id
-        region.plate_x = x
-        region.plate_y = y
-        region.active = False
-        self.area += region.metrics.area
-        self.currency -= region.metrics.cost
-        self.queued_regions.append(region)
+        layers = self.layers
+        cell = iy * self.max_x + ix
+        layers.plate[iy, ix] = self.id
+        layers.plate_x[iy, ix] = x
+        layers.plate_y[iy, ix] = y
+        layers.active[iy, ix] = True
+        layers.mark_dirty(ix, iy)
+        layers.record_plate_change(ix, iy)
+        layers.plate_version += 1
+        self.area += layers.metrics[iy].area
+        self.currency -= layers.metrics[iy].cost
+        self.frontier.append(cell)
         self._set_boundary(self.west_end, self.east_end, iy, x)
         self._set_boundary(self.north_end, self.south_end, ix, y)
         self._add_distance(ix, iy)
@@ -160,6 +175,10 @@ class Plate():
         for x in range(self.max_x):
             self.claim_region(x, y)
 
+        self.set_pole(y)
+
+    def set_pole(self, y: int) -> None:
+        """Makes the plate center on the pole at y"""
         self.relative_growth = 0.05
 
         # Have land centering at the pole
@@ -170,13 +189,95 @@ class Plate():
             self.type = constants.SOUTH
             self.pole_type = constants.SOUTH
 
-    def _awaken_regions(self) -> int:
-        """Counts amount of regions which the plate can expand from"""
-        amount = 0
-        for region in self.queued_regions:
-            region.active = True
-            amount += 1
-        return amount
+    def rebuild_extents(self, cells: np.ndarray = None) -> None:
+        """Rebuilds plate boundaries, distances and area from the layer store.
+        Used after regions are claimed by other means than claim_region.
+        Cells are the flat indexes y * max_x + x of all regions of the plate,
+        found from the layer store if not given"""
+        if cells is None:
+            cells = np.flatnonzero(self.layers.plate == self.id)
+        rows, columns = np.divmod(cells, self.max_x)
+        plate_x = self.layers.plate_x.reshape(-1)[cells]
+        plate_y = self.layers.plate_y.reshape(-1)[cells]
+
+        west = np.full(self.max_y, np.iinfo(plate_x.dtype).max, dtype=plate_x.dtype)
+        east = np.full(self.max_y, np.iinfo(plate_x.dtype).min, dtype=plate_x.dtype)
+        north = np.full(self.max_x, np.iinfo(plate_y.dtype).max, dtype=plate_y.dtype)
+        south = np.full(self.max_x, np.iinfo(plate_y.dtype).min, dtype=plate_y.dtype)
+        np.minimum.at(west, rows, plate_x)
+        np.maximum.at(east, rows, plate_x)
+        np.minimum.at(north, columns, plate_y)
+        np.maximum.at(south, columns, plate_y)
+
+        horizontal = np.bincount(rows, minlength=self.max_y)
+        vertical = np.bincount(columns, minlength=self.max_x)
+        ascending = np.bincount((columns - rows) % self.max_x, minlength=self.max_x)
+        descending = np.bincount((columns + rows) % self.max_x, minlength=self.max_x)
+
+        claimed_rows = np.flatnonzero(horizontal).tolist()
+        claimed_columns = np.flatnonzero(vertical).tolist()
+        self.west_end = {y: int(west[y]) for y in claimed_rows}
+        self.east_end = {y: int(east[y]) for y in claimed_rows}
+        self.north_end = {x: int(north[x]) for x in claimed_columns}
+        self.south_end = {x: int(south[x]) for x in claimed_columns}
+        self.horizontal_distance = {y: int(horizontal[y]) for y in claimed_rows}
+        self.vertical_distance = {x: int(vertical[x]) for x in claimed_columns}
+        self.ascending_distance = {key: int(ascending[key])
+                                   for key in np.flatnonzero(ascending).tolist()}
+        self.descending_distance = {key: int(descending[key])
+                                    for key in np.flatnonzero(descending).tolist()}
+        self.area = int(horizontal @ self.layers.area)
+
+    @property
+    def claimed_regions(self) -> list[Region]:
+        """Regions belonging to the plate, which the plate has expanded from"""
+        rows, columns = np.nonzero(self.get_claimed_mask())
+        return [self.world_map[y][x] for y, x in zip(rows.tolist(), columns.tolist())]
+
+    @property
+    def queued_regions(self) -> list[Region]:
+        """Regions belonging to the plate, which the plate can expand from"""
+        return [self.world_map[cell // self.max_x][cell % self.max_x]
+                for cell in self.frontier]
+
+    def get_claimed_mask(self) -> np.ndarray:
+        """Returns a boolean array, which is true for claimed regions"""
+        return (self.layers.plate == self.id) & ~self.layers.active
+
+    def _expand_frontier(self, limit: int) -> None:
+        """Expands from up to limit randomly chosen regions in the frontier,
+        while growth currency remains. Regions queued during this call are not expanded from"""
+        frontier = self.frontier
+        plate = self.layers.plate
+        remaining = len(frontier)
+
+        while limit > 0 and self.currency > 0 and remaining > 0:
+            # Swap-remove a random region among the previously queued regions.
+            # The last previously queued region fills the gap,
+            # and the last newly queued region takes its place
+            index = self.rng.randrange(remaining)
+            cell = frontier[index]
+            remaining -= 1
+            frontier[index] = frontier[remaining]
+            frontier[remaining] = frontier[-1]
+            frontier.pop()
+
+            row, column = divmod(cell, self.max_x)
+            plate_x = self.layers.plate_x.item(row, column)
+            plate_y = self.layers.plate_y.item(row, column)
+
+            for dir in range(1, 8, 2):
+                x, y = self._get_next_coordinates(plate_x, plate_y, dir)
+                ix, iy = self._get_coordinates(x, y)
+
+                if plate.item(iy, ix) == -1:
+                    if iy == 0 or iy == self.max_y - 1:
+                        self.claim_pole(y)
+                    else:
+                        self.claim_region(x, y)
+            self.layers.active[row, column] = False
+            self.layers.record_plate_change(column, row)
+            limit -= 1
 
     def expand(self) -> int:
         """Expands the plate in random directions. Returns remaining growth currency.
@@ -185,7 +286,7 @@ class Plate():
         If a plate has little space to expand, it will expand with greater focus
         to claim the vacant spaces.
         """
-        active_regions = self._awaken_regions()
+        active_regions = len(self.frontier)
         limit = math.ceil(active_regions * 0.75)
         self.currency += self.growth
 
@@ -193,34 +294,14 @@ class Plate():
             self.alive = False
             return 0
 
-        random.shuffle(self.queued_regions)
-
-        while limit > 0 and self.currency > 0:
-            region = self.queued_regions[0]
-            if not region.active:
-                break
-
-            for dir in range(1, 8, 2):
-                x, y = self._get_next_coordinates(
-                    region.plate_x, region.plate_y, dir)
-                ix, iy = self._get_coordinates(x, y)
-
-                if self.world_map[iy][ix].plate == -1:
-                    if iy == 0 or iy == self.max_y - 1:
-                        self.claim_pole(y)
-                    else:
-                        self.claim_region(x, y)
-            region.active = False
-            limit -= 1
-            self.claimed_regions.append(region)
-            self.queued_regions.remove(region)
+        self._expand_frontier(limit)
         return self.currency
 
     def expand_blindly(self) -> int:
         """Expands the plate in random directions. Returns remaining growth currency.
         Plates will expand no faster than 1 cell per method call in any direction.
         Plates expansion should not speed up even if expansion choices are limited"""
-        active_regions = self._awaken_regions()
+        active_regions = len(self.frontier)
         limit = math.ceil(active_regions * 0.75)
         self.currency += active_regions * self.relative_growth
 
@@ -228,30 +309,28 @@ class Plate():
             self.alive = False
             return 0
 
-        random.shuffle(self.queued_regions)
-
-        while limit > 0 and self.currency > 0:
-            region = self.queued_regions[0]
-            if not region.active:
-                break
-
-            for dir in range(1, 8, 2):
-                x, y = self._get_next_coordinates(
-                    region.plate_x, region.plate_y, dir)
-                ix, iy = self._get_coordinates(x, y)
-
-                if self.world_map[iy][ix].plate == -1:
-                    if iy == 0 or iy == self.max_y - 1:
-                        self.claim_pole(y)
-                    else:
-                        self.claim_region(x, y)
-            region.active = False
-            self.claimed_regions.append(region)
-            self.queued_regions.remove(region)
-            limit -= 1
+        self._expand_frontier(limit)
         return self.currency
 
-    def _horizontal_land_scan(self) -> None:
+    def _include_ranks(self, line_mask: np.ndarray, lengths: np.ndarray,
+                       first_margin: float, second_margin: float) -> np.ndarray:
+        """Returns which plate regions to include along scan lines.
+        Line mask is true for plate regions, indexed by (line, position along line).
+        The first and last plate regions of each line are skipped,
+        by the given margins of the line length"""
+        first_skip = (lengths * first_margin).astype(np.int64)
+        second_skip = (lengths * second_margin).astype(np.int64)
+        include = lengths - first_skip - second_skip
+        # Rank of each plate region along its line, counting from 0
+        rank = np.cumsum(line_mask, axis=1) - 1
+        return line_mask & (rank >= first_skip[:, np.newaxis]) \
+            & (rank < (first_skip + include)[:, np.newaxis])
+
+    def _get_lengths(self, distance: dict[int, int], keys: np.ndarray) -> np.ndarray:
+        """Returns the distances of the given keys as an array"""
+        return np.array([distance[key] for key in keys.tolist()], dtype=np.int64)
+
+    def _horizontal_land_scan(self, plate_mask: np.ndarray) -> None:
         """Scans plate horizontally, finding valid land positions on each vertical"""
         if self.type in (constants.WEST, constants.CENTER, constants.EAST):
             north_margin = self.margin
@@ -263,27 +342,14 @@ class Plate():
             north_margin = self.margin * 2
             south_margin = 0
 
-        for column in self.north_end.keys():
-            length = self.vertical_distance[column]
-            start = self.north_end[column]
-            end = self.south_end[column]
-
-            first_skip = int(length * north_margin)
-            second_skip = int(length * south_margin)
-            include = length - first_skip - second_skip
-
-            for row in range(start, end + 1):
-                x, y = self._get_coordinates(column, row)
-                if self.world_map[y][x].plate == self.id:
-                    if first_skip > 0:
-                        first_skip -= 1
-                    elif include > 0:
-                        self.world_map[y][x].horizontal_land_check = True
-                        include -= 1
-                    else:
-                        break
+        columns = np.array(list(self.north_end.keys()), dtype=np.int64)
+        lengths = self._get_lengths(self.vertical_distance, columns)
+        include = self._include_ranks(plate_mask.T[columns], lengths,
+                                      north_margin, south_margin)
+        lines, rows = np.nonzero(include)
+        self.layers.horizontal_land_check[rows, columns[lines]] = True
 
-    def _vertical_land_scan(self) -> None:
+    def _vertical_land_scan(self, plate_mask: np.ndarray) -> None:
         """Scans plate vertically, finding valid land positions on each horizontal"""
 
         if self.pole_type in (constants.NORTH, constants.SOUTH):
@@ -300,27 +366,40 @@ class Plate():
             west_margin = self.margin * 2
             east_margin = 0
 
-        for row in self.west_end.keys():
-            length = self.horizontal_distance[row]
-            start = self.west_end[row]
-            end = self.east_end[row]
-
-            first_skip = int(length * west_margin)
-            second_skip = int(length * east_margin)
-            include = length - first_skip - second_skip
-
-            for column in range(start, end + 1):
-                x, y = self._get_coordinates(column, row)
-                if self.world_map[y][x].plate == self.id:
-                    if first_skip > 0:
-                        first_skip -= 1
-                    elif include > 0:
-                        self.world_map[y][x].vertical_land_check = True
-                        include -= 1
-                    else:
-                        break
-
-    def _ascending_land_scan(self) -> None:
+        rows = np.array(list(self.west_end.keys()), dtype=np.int64)
+        lengths = self._get_lengths(self.horizontal_distance, rows)
+        # Each horizontal is scanned eastwards from its west end, around the globe
+        west_end = np.array([self.west_end[row] for row in rows.tolist()], dtype=np.int64)
+        columns = (west_end[:, np.newaxis] + np.arange(self.max_x)) % self.max_x
+        include = self._include_ranks(plate_mask[rows[:, np.newaxis], columns], lengths,
+                                      west_margin, east_margin)
+        lines, positions = np.nonzero(include)
+        self.layers.vertical_land_check[rows[lines], columns[lines, positions]] = True
+
+    def _diagonal_land_scan(self, plate_mask: np.ndarray, distance: dict[int, int],
+                            step: int, first_margin: float, second_margin: float,
+                            land_check: np.ndarray) -> None:
+        """Scans the plate diagonally, starting at the northern edge of each diagonal in distance.
+        Step is the horizontal step for each step south, 1 or -1.
+        Diagonals continue across the south pole, like _get_coordinates"""
+        path = [self._get_coordinates(step * row, row) for row in range(self.max_x)]
+        shifts = np.array([x for x, y in path], dtype=np.int64)
+        path_rows = np.array([y for x, y in path], dtype=np.int64)
+
+        keys = np.array(list(distance.keys()), dtype=np.int64)
+        lengths = self._get_lengths(distance, keys)
+        # Limits the size of the scanned arrays
+        chunk = max(1, 2**22 // self.max_x)
+
+        for start in range(0, len(keys), chunk):
+            columns = (keys[start:start + chunk, np.newaxis] + shifts) % self.max_x
+            include = self._include_ranks(plate_mask[path_rows, columns],
+                                          lengths[start:start + chunk],
+                                          first_margin, second_margin)
+            lines, positions = np.nonzero(include)
+            land_check[path_rows[positions], columns[lines, positions]] = True
+
+    def _ascending_land_scan(self, plate_mask: np.ndarray) -> None:
         """Scans the plate diagonally, finding valid land position in northwest to southeast diagonal"""
         if self.type in (constants.NORTH, constants.WEST, constants.NORTHWEST):
             northwest_margin = 0
@@ -332,26 +411,11 @@ class Plate():
             northwest_margin = self.margin * 2
             southeast_margin = 0
 
-        for start_x, length in self.ascending_distance.items():
-            first_skip = int(length * northwest_margin)
-            second_skip = int(length * southeast_margin)
-            include = length - first_skip - second_skip
-            row = 0
-
-            for column in range(start_x, start_x + self.max_x):
-                x, y = self._get_coordinates(column, row)
-
-                if self.world_map[y][x].plate == self.id:
-                    if first_skip > 0:
-                        first_skip -= 1
-                    elif include > 0:
-                        self.world_map[y][x].ascending_land_check = True
-                        include -= 1
-                    else:
-                        break
-                row += 1
+        self._diagonal_land_scan(plate_mask, self.ascending_distance, 1,
+                                 northwest_margin, southeast_margin,
+                                 self.layers.ascending_land_check)
 
-    def _descending_land_scan(self) -> None:
+    def _descending_land_scan(self, plate_mask: np.ndarray) -> None:
         """Scans the plate diagonally, finding valid land positions in northeast to southwest diagonal"""
         if self.type in (constants.NORTH, constants.NORTHEAST, constants.EAST):
             northeast_margin = 0
@@ -363,123 +427,88 @@ class Plate():
             northeast_margin = self.margin * 2
             southwest_margin = 0
 
-        for start_x, length in self.descending_distance.items():
-            first_skip = int(length * northeast_margin)
-            second_skip = int(length * southwest_margin)
-            include = length - first_skip - second_skip
-            row = 0
-
-            for column in range(start_x, start_x - self.max_x, -1):
-                x, y = self._get_coordinates(column, row)
-
-                if self.world_map[y][x].plate == self.id:
-                    if first_skip > 0:
-                        first_skip -= 1
-                    elif include > 0:
-                        self.world_map[y][x].descending_land_check = True
-                        include -= 1
-                    else:
-                        break
-                row += 1
+        self._diagonal_land_scan(plate_mask, self.descending_distance, -1,
+                                 northeast_margin, southwest_margin,
+                                 self.layers.descending_land_check)
 
-    def _pole_border_correction(self) -> None:
+    def _pole_border_correction(self, plate_mask: np.ndarray) -> None:
         """Disables globe circling in west end and east end coordinates.
         In function, this should solve continent placement bugs
         which resulted in unexpected water in the far east or west"""
         start = min(self.east_end.keys())
         end = max(self.east_end.keys())
 
-        for y in range(start, end):
-            for x in range(self.max_x):
-                if self.world_map[y][x].plate == self.id:
-                    self.west_end[y] = x
-                    break
+        rows = plate_mask[start:end]
+        west = rows.argmax(axis=1)
+        east = self.max_x - 1 - rows[:, ::-1].argmax(axis=1)
 
-            for x in range(self.max_x - 1, -1, -1):
-                if self.world_map[y][x].plate == self.id:
-                    self.east_end[y] = x
-                    break
+        for y in (np.flatnonzero(rows.any(axis=1)) + start).tolist():
+            self.west_end[y] = int(west[y - start])
+            self.east_end[y] = int(east[y - start])
 
     def create_land(self) -> None:
         """Creates an ocean or continent on this plate, depending on plate type"""
-        self.land_area = 0
-        self.sea_area = 0
+        layers = self.layers
+        plate_mask = layers.plate == self.id
+        claimed = self.get_claimed_mask()
 
         if self.pole_type != 0:
-            self._pole_border_correction()
+            self._pole_border_correction(plate_mask)
 
         if self.type == constants.LAND:
-            for region in self.claimed_regions:
-                region.set_terrain(constants.LAND)
-                self.land_area += region.metrics.area
+            land = claimed
         elif self.type == constants.WATER:
-            for region in self.claimed_regions:
-                region.set_terrain(constants.WATER)
-                self.sea_area += region.metrics.area
+            land = np.zeros_like(claimed)
         else:
             if self.type in (
                     constants.CENTER, constants.NORTHEAST, constants.SOUTHEAST,
                     constants.SOUTHWEST, constants.NORTHWEST) or self.pole_type != 0:
-                self._horizontal_land_scan()
-                self._vertical_land_scan()
+                self._horizontal_land_scan(plate_mask)
+                self._vertical_land_scan(plate_mask)
             else:
-                self._ascending_land_scan()
-                self._descending_land_scan()
-
-            for region in self.claimed_regions:
-                if (region.horizontal_land_check and region.vertical_land_check) \
-                        or (region.ascending_land_check and region.descending_land_check):
-                    region.set_terrain(constants.LAND)
-                    self.land_area += region.metrics.area
-                else:
-                    region.set_terrain(constants.WATER)
-                    self.sea_area += region.metrics.area
+                self._ascending_land_scan(plate_mask)
+                self._descending_land_scan(plate_mask)
+
+            land = claimed & ((layers.horizontal_land_check & layers.vertical_land_check)
+                              | (layers.ascending_land_check & layers.descending_land_check))
+
+        sea = claimed & ~land
+        layers.set_terrain(land, constants.LAND)
+        layers.set_terrain(sea, constants.WATER)
+        self.land_area = layers.get_area(land)
+        self.sea_area = layers.get_area(sea)
 
     def sink(self) -> None:
         """Clears all land from this plate. Clears land and sea area calculations"""
         self.land_area = 0
         self.sea_area = 0
 
-        for region in self.claimed_regions:
-            region.set_terrain(constants.WATER)
-            region.horizontal_land_check = False
-            region.vertical_land_check = False
-            region.ascending_land_check = False
-            region.descending_land_check = False
+        layers = self.layers
+        claimed = self.get_claimed_mask()
+        layers.set_terrain(claimed, constants.WATER)
+        layers.horizontal_land_check[claimed] = False
+        layers.vertical_land_check[claimed] = False
+        layers.ascending_land_check[claimed] = False
+        layers.descending_land_check[claimed] = False
 
     def find_boundary(self) -> list[Region]:
         """Returns a list of regions, located at the plate boundary of this plate.
         Before calling this method, world.find_plate_boundaries must be called"""
-        boundary = []
-
-        for region in self.claimed_regions:
-            if region.is_boundary():
-                boundary.append(region)
+        return self._get_regions(self.get_claimed_mask() & (self.layers.boundary != 0))
 
-        return boundary
+    def _get_regions(self, mask: np.ndarray) -> list[Region]:
+        """Returns the regions where mask is true"""
+        rows, columns = np.nonzero(mask)
+        return [self.world_map[y][x] for y, x in zip(rows.tolist(), columns.tolist())]
 
     def find_border_of_terrain(self, external_terrain: int) -> list[Region]:
         """Returns a list of regions at the plate border,
         so that the terrain beyond the plate border equals the given terrain
-        (for at least one region immediately beyond the plate).
-        Before calling this method, world.find_plate_boundaries must be called"""
-        border = []
-
-        for region in self.claimed_regions:
-            for dir in range(1, 9):
-                x, y = constants.get_next_index(region.x, region.metrics.y,
-                                                dir, self.max_x, self.max_y)
-                try:
-                    neighbor: Region = self.world_map[y][x]
-                except IndexError:
-                    continue
-
-                if neighbor.plate != self.id \
-                    and constants.is_type(neighbor.terrain, external_terrain) \
-                        and neighbor not in border:
-                    region.border_distance = 1
-                    border.append(region)
-        return border
+        (for at least one region immediately beyond the plate)"""
+        distances = self.layers.get_border_distance(self.id, external_terrain)
+        border = distances == 1
+        self.layers.border_distance[border] = 1
+        return self._get_regions(border)
 
     def find_border_distance(self, external_terrain: int, max_distance: int = 100) -> list[list[Region]]:
         """Returns a two-dimensional list of regions,
@@ -487,38 +516,22 @@ class Plate():
         to an out-of-plate region with terrain equal to the given external terrain
         The algorithm terminates at max distance or when all regions have been found.
         """
-        for region in self.claimed_regions:
-            region.border_distance = -1
-
-        circles = []
-        current_circle = self.find_border_of_terrain(external_terrain)
-        circles.append(current_circle)
-
-        if max_distance == 1:
-            return circles
-
-        for distance in range(2, max_distance + 1):
-            previous_circle = current_circle
-            current_circle = []
-
-            for region in previous_circle:
-                for dir in range(1, 9):
-                    x, y = constants.get_next_index(region.x, region.metrics.y,
-                                                    dir, self.max_x, self.max_y)
-                    try:
-                        neighbor: Region = self.world_map[y][x]
-                    except IndexError:
-                        continue
-
-                    if neighbor.plate == self.id and neighbor.border_distance == -1:
-                        neighbor.border_distance = distance
-                        current_circle.append(neighbor)
-
-            if len(current_circle) > 0:
-                circles.append(current_circle)
-            else:
-                return circles
-        return circles
+        distances = self.layers.get_border_distance(self.id, external_terrain)
+        claimed = self.get_claimed_mask()
+        found = (distances > 0) & (distances <= max_distance)
+        self.layers.border_distance[claimed] = -1
+        self.layers.border_distance[found] = distances[found]
+
+        # Group found regions by distance. Distances found are consecutive, starting at 1
+        cells = np.flatnonzero(found)
+        cells = cells[np.argsort(distances.reshape(-1)[cells], kind="stable")]
+        ends = np.cumsum(np.bincount(distances.reshape(-1)[cells])[1:])
+        regions = [self.world_map[cell // self.max_x][cell % self.max_x]
+                   for cell in cells.tolist()]
+
+        circles = [regions[start:end] for start, end in zip([0, *ends[:-1].tolist()],
+                                                            ends.tolist())]
+        return circles if circles else [[]]
 
     def find_border_offset(self, internal_terrain: int, external_terrain: int,
                            min_distance: int, max_distance: int) -> list[Region]:
@@ -527,19 +540,10 @@ class Plate():
         min distance and max distance, and the resulting regions terrain
         equals the internal terrain.
         (only out-of-plate regions next to the plate border are considered)"""
-        result = []
-        circles = self.find_border_distance(external_terrain, max_distance)
-
-        distance = 1
-
-        for circle in circles:
-            if distance >= min_distance:
-                for region in circle:
-                    if constants.is_type(region.terrain, internal_terrain):
-                        result.append(region)
-            distance += 1
-
-        return result
+        distances = self.layers.get_border_distance(self.id, external_terrain)
+        offset = (distances >= max(min_distance, 1)) & (distances <= max_distance) \
+            & self.layers.get_type_mask(internal_terrain)
+        return self._get_regions(offset)
 
     def get_info(self) -> str:
         """Returns plate information"""
@@ -0,0 +1,180 @@
+from layers import LayerStore
+from plate import Plate
+from random_stream import create_generator
+import numpy as np
+
+
+class PlateFlood():
+    """Grows all tectonic plates at once, as a multi-source shortest path flood.
+    Each cell is claimed by the plate reaching it first.
+    Crossing a cell from east to west costs its region cost, which shrinks towards the poles.
+    Crossing from north to south costs as much as at the equator.
+    Costs are scaled by random noise and plate growth.
+    Arrival times are grouped in buckets, and each bucket is flooded with array operations"""
+
+    def __init__(self, layers: LayerStore, plates: list[Plate], seed: int, step: float = 4):
+        """Prepares a flood from the cells already claimed by plates.
+
+        Args:
+            step:
+                roughly how many cells the plates advance in each expansion"""
+        self.layers = layers
+        self.plates = plates
+        self.length = layers.length
+        self.height = layers.height
+        size = self.length * self.height
+
+        # Exponential noise makes the flood behave like plates expanding from
+        # randomly chosen frontier regions, giving the same irregular plate shapes
+        cost = np.array([metrics.cost for metrics in layers.metrics], dtype=np.float32)
+        noise = create_generator(seed, "flood").standard_exponential(size, dtype=np.float32)
+        self.horizontal_weight: np.ndarray = (noise.reshape(self.height, self.length)
+                                              * cost[:, np.newaxis]).ravel()
+        self.vertical_weight: np.ndarray = noise * cost.max()
+
+        # Plates claim area in proportion to their growth, like the other algorithms,
+        # so the speed of a plate front scales with the square root of growth
+        self.scale: np.ndarray = np.array([1 / np.sqrt(plate.growth) for plate in plates],
+                                          dtype=np.float32)
+        self.start_x: np.ndarray = np.array([plate.start_x for plate in plates], dtype=np.int32)
+
+        self.owner: np.ndarray = layers.plate.ravel().copy()
+        # Settled cells have arrival time minus infinity, so they are never reached again
+        self.arrival: np.ndarray = np.full(size, np.inf, dtype=np.float32)
+        # Scratch space for removing repeated cells without sorting
+        self.slot: np.ndarray = np.zeros(size, dtype=np.int32)
+
+        # Cells reached, but not yet settled. Cells may be repeated.
+        # Cells are kept as intp, since other index types are converted on every lookup
+        self.queue: np.ndarray = np.flatnonzero(self.owner >= 0)
+        self.arrival[self.queue] = 0
+
+        self.time: float = 0
+        self.delta: float = step * float(cost.mean()) * float(self.scale.max())
+
+    def _unique(self, cells: np.ndarray) -> np.ndarray:
+        """Returns cells without repetitions, in no particular order"""
+        positions = np.arange(len(cells), dtype=np.int32)
+        self.slot[cells] = positions
+        return cells[self.slot[cells] == positions]
+
+    def _reach(self, arrival: np.ndarray, owner: np.ndarray, scale: np.ndarray,
+               targets: np.ndarray, weight: np.ndarray) -> np.ndarray:
+        """Reaches targets, where it is faster than before.
+        Each target may appear only once. Returns the targets reached"""
+        arrival = arrival + weight[targets] * scale
+        faster = np.flatnonzero(arrival < self.arrival[targets])
+        targets = targets[faster]
+
+        self.arrival[targets] = arrival[faster]
+        self.owner[targets] = owner[faster]
+        return targets
+
+    def _reach_pole(self, arrival: np.ndarray, owner: np.ndarray,
+                    cells: np.ndarray, row: int) -> np.ndarray:
+        """Reaches the entire pole row from the earliest of cells on it.
+        Returns the cells reached"""
+        start = row * self.length
+        on_pole = (cells >= start) & (cells < start + self.length)
+
+        if not on_pole.any():
+            return cells[on_pole]
+
+        source = np.argmin(np.where(on_pole, arrival, np.inf))
+        targets = np.arange(start, start + self.length, dtype=np.intp)
+        targets = targets[arrival[source] < self.arrival[targets]]
+
+        self.arrival[targets] = arrival[source]
+        self.owner[targets] = owner[source]
+        return targets
+
+    def _relax(self, cells: np.ndarray, arrival: np.ndarray) -> np.ndarray:
+        """Reaches the neighbours of cells settled at the given arrival times.
+        Returns the cells reached, possibly repeated.
+        Cells at the edge of the map reach themselves instead of a neighbour beyond,
+        which is never faster"""
+        length = self.length
+        size = self.length * self.height
+        owner = self.owner[cells]
+        scale = self.scale[owner]
+        columns = cells % length
+
+        north = np.where(cells >= length, cells - length, cells)
+        south = np.where(cells < size - length, cells + length, cells)
+        east = np.where(columns == length - 1, cells - (length - 1), cells + 1)
+        west = np.where(columns == 0, cells + (length - 1), cells - 1)
+
+        return np.concatenate([self._reach(arrival, owner, scale, north, self.vertical_weight),
+                               self._reach(arrival, owner, scale, south, self.vertical_weight),
+                               self._reach(arrival, owner, scale, east, self.horizontal_weight),
+                               self._reach(arrival, owner, scale, west, self.horizontal_weight),
+                               self._reach_pole(arrival, owner, cells, 0),
+                               self._reach_pole(arrival, owner, cells, self.height - 1)])
+
+    def expand(self) -> bool:
+        """Advances the flood by one bucket of arrival time,
+        and writes the cells claimed to the layer store.
+        Returns true when the flood covers the entire world"""
+        self.time += self.delta
+        arrival = self.arrival[self.queue]
+        soon = arrival <= self.time
+        current = self.queue[soon & (arrival > -np.inf)]
+        later = [self.queue[~soon]]
+        claimed = []
+
+        while len(current) > 0:
+            # Reached cells are never settled, since settled cells can't be reached
+            cells = self._unique(current)
+            arrival = self.arrival[cells]
+            self.arrival[cells] = -np.inf
+            claimed.append(cells)
+
+            reached = self._relax(cells, arrival)
+            soon = self.arrival[reached] <= self.time
+            current = reached[np.flatnonzero(soon)]
+            later.append(reached[np.flatnonzero(~soon)])
+
+        self.queue = np.concatenate(later)
+
+        if claimed:
+            self._write(np.concatenate(claimed))
+
+        return len(self.queue) == 0
+
+    def _write(self, cells: np.ndarray) -> None:
+        """Writes the plates of cells to the layer store, as claimed. Cells may be repeated"""
+        self.layers.plate.reshape(-1)[cells] = self.owner[cells]
+        self.layers.active.reshape(-1)[cells] = False
+        self.layers.plate_version += 1
+        rows, columns = np.divmod(cells, self.length)
+        self.layers.mark_dirty_cells(rows, columns)
+        self.layers.record_plate_changes(cells)
+
+    def finish(self) -> None:
+        """Hands the claimed cells over to the plates.
+        Plates stop expanding, and their extents are rebuilt from the layer store.
+        Plate coordinates are unwrapped around the starting point of each plate"""
+        layers = self.layers
+        length = self.length
+        start_x = self.start_x[layers.plate]
+        columns = np.arange(length, dtype=np.int32)
+        layers.plate_x[:] = start_x + (columns - start_x + length // 2) % length - length // 2
+        layers.plate_y[:] = np.arange(self.height, dtype=np.int32)[:, np.newaxis]
+        if layers.recording_changes:
+            layers.record_plate_changes(np.flatnonzero(layers.active))
+        layers.active[:] = False
+
+        # Group cells by plate, to find the cells of every plate at once
+        cells = np.argsort(layers.plate, axis=None, kind="stable")
+        ends = np.cumsum(np.bincount(layers.plate.ravel() + 1, minlength=len(self.plates) + 1))
+
+        for plate in self.plates:
+            plate.frontier.clear()
+            plate.alive = False
+            plate.rebuild_extents(cells[ends[plate.id]:ends[plate.id + 1]])
+
+        # Pole rows are always claimed whole, by a single plate
+        for row in (0, self.height - 1):
+            owner = self.owner[row * self.length]
+            if owner >= 0:
+                self.plates[owner].set_pole(row)
@@ -20,6 +20,7 @@ class PlateOptions():
         self.algorithm = QtWidgets.QComboBox()
         self.algorithm.addItem("Relative growth")
         self.algorithm.addItem("Fixed growth")
+        self.algorithm.addItem("Flood growth")
         self.layout.addWidget(self.algorithm)
 
         self.min_growth_label = QtWidgets.QLabel("Miniumum growth rate")
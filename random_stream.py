@@ -0,0 +1,21 @@
+import numpy as np
+import random
+
+
+def create_stream(seed: int, *keys) -> random.Random:
+    """Returns an independent random number generator,
+    derived from a world seed and the keys identifying an entity.
+    The same seed and keys always give the same stream,
+    regardless of process or the order entities are created in"""
+    return random.Random(":".join(str(part) for part in (seed, *keys)))
+
+
+def create_seed() -> int:
+    """Returns a random world seed"""
+    return random.SystemRandom().randrange(2**32)
+
+
+def create_generator(seed: int, *keys) -> np.random.Generator:
+    """Returns an independent NumPy random number generator,
+    for drawing many values at once. Derived like create_stream"""
+    return np.random.default_rng(create_stream(seed, *keys).getrandbits(128))
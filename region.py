@@ -1,69 +1,106 @@
 from region_metrics import RegionMetrics
+from layers import LayerStore, BOUNDARY_BITS
 import constants
 
 
+class LayerAttribute():
+    """Exposes a single cell of a layer store array as a region attribute.
+    The attribute name is used as layer name"""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.layer = name
+
+    def __get__(self, region: "Region", owner: type = None):
+        if region is None:
+            return self
+        return getattr(region.layers, self.layer)[region.metrics.y, region.x].item()
+
+    def __set__(self, region: "Region", value) -> None:
+        getattr(region.layers, self.layer)[region.metrics.y, region.x] = value
+
+
 class Region():
-    """Represents an area on the globe, confined by longitude and latitude lines"""
+    """Represents an area on the globe, confined by longitude and latitude lines.
+    A region is a lightweight view over one cell of a layer store"""
+
+    __slots__ = ("x", "metrics", "layers")
+
+    update_subdivision = LayerAttribute()
 
-    def __init__(self, x: int, metrics: RegionMetrics):
+    # Plate belonging
+    plate = LayerAttribute()
+
+    # Variables used by plate
+    plate_x = LayerAttribute()
+    plate_y = LayerAttribute()
+    border_distance = LayerAttribute()
+    active = LayerAttribute()
+
+    horizontal_land_check = LayerAttribute()
+    vertical_land_check = LayerAttribute()
+    ascending_land_check = LayerAttribute()
+    descending_land_check = LayerAttribute()
+
+    terrain = LayerAttribute()
+
+    boundary = LayerAttribute()
+
+    def __init__(self, x: int, metrics: RegionMetrics, layers: LayerStore):
         super().__init__()
 
         self.x: int = x
         self.metrics = metrics
+        self.layers = layers
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Region) and self.layers is other.layers \
+            and self.x == other.x and self.metrics.y == other.metrics.y
 
-        step = 360 // metrics.length_division
-        self.west = x * step - 180
-        self.east = self.west + step
+    def __hash__(self) -> int:
+        return hash((id(self.layers), self.x, self.metrics.y))
 
-        self.update_subdivision: bool = False
+    @property
+    def west(self) -> int:
+        return self.x * (360 // self.metrics.length_division) - 180
 
-        # Plate belonging
-        self.plate: int = -1
+    @property
+    def east(self) -> int:
+        return self.west + 360 // self.metrics.length_division
 
-        # Variables used by plate
-        self.plate_x: int = 0
-        self.plate_y: int = 0
-        self.border_distance: int = -1
-        self.active: bool = True
+    @property
+    def north_boundary(self) -> bool:
+        return self.has_boundary_at(constants.NORTH)
 
-        self.horizontal_land_check = False
-        self.vertical_land_check = False
-        self.ascending_land_check = False
-        self.descending_land_check = False
+    @property
+    def east_boundary(self) -> bool:
+        return self.has_boundary_at(constants.EAST)
 
-        self.terrain = constants.WATER
+    @property
+    def south_boundary(self) -> bool:
+        return self.has_boundary_at(constants.SOUTH)
 
-        self.north_boundary = False
-        self.east_boundary = False
-        self.south_boundary = False
-        self.west_boundary = False
+    @property
+    def west_boundary(self) -> bool:
+        return self.has_boundary_at(constants.WEST)
 
     def has_boundary_at(self, direction: int) -> bool:
         """Returns true if the region in the given direction
         belongs to a different plate"""
-        if direction == constants.NORTH:
-            return self.north_boundary
-        elif direction == constants.EAST:
-            return self.east_boundary
-        elif direction == constants.SOUTH:
-            return self.south_boundary
-        elif direction == constants.WEST:
-            return self.west_boundary
-        else:
-            return False
+        return bool(self.boundary & BOUNDARY_BITS.get(direction, 0))
 
     def is_boundary(self):
         """Returns true if this region is at a plate boundary"""
-        return (self.north_boundary or self.east_boundary
-                or self.south_boundary or self.west_boundary)
+        return self.boundary != 0
 
     def set_terrain(self, terrain: int, set_update_flag: bool = True) -> None:
         """Sets the regions terrain.
         If set_update_flag is true, the same terrain should be applied
         to smaller-sized areas belonging to this region.
-        This function will not set the terrain of those areas."""
+        This function will not set the terrain of those areas,
+        but records the edit in the layer store."""
         self.terrain = terrain
         self.update_subdivision = set_update_flag
+        self.layers.mark_dirty(self.x, self.metrics.y)
 
     def get_info(self) -> str:
         text = f"""Latitude: {self.metrics.south} to {self.metrics.north}
@@ -73,3 +110,43 @@ Height: {self.metrics.vertical_stretch:,} km
 Area: {self.metrics.area:,} km2
 Cost: {self.metrics.cost:.4}"""
         return text
+
+
+class RegionRow():
+    """A horizontal circle of regions, accessed like a list"""
+
+    def __init__(self, layers: LayerStore, metrics: RegionMetrics):
+        self.layers = layers
+        self.metrics = metrics
+
+    def __len__(self) -> int:
+        return self.layers.length
+
+    def __getitem__(self, x: int) -> Region:
+        if x < 0:
+            x += self.layers.length
+        if not 0 <= x < self.layers.length:
+            raise IndexError(f"Region index {x} out of range")
+        return Region(x, self.metrics, self.layers)
+
+    def __iter__(self):
+        for x in range(self.layers.length):
+            yield Region(x, self.metrics, self.layers)
+
+
+class RegionGrid():
+    """All regions of a layer store, accessed like a two-dimensional list grid[y][x].
+    Regions are created on access, so the grid itself holds no region objects"""
+
+    def __init__(self, layers: LayerStore):
+        self.layers = layers
+
+    def __len__(self) -> int:
+        return self.layers.height
+
+    def __getitem__(self, y: int) -> RegionRow:
+        return RegionRow(self.layers, self.layers.metrics[y])
+
+    def __iter__(self):
+        for metrics in self.layers.metrics:
+            yield RegionRow(self.layers, metrics)
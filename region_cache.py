@@ -0,0 +1,59 @@
+from collections import OrderedDict
+from kilometer_map import KilometerMap
+
+
+class RegionCache():
+    """Keeps recently constructed kilometer maps, within a memory budget.
+    Maps are stored by region and terrain version.
+    When the budget is exceeded, the least recently used maps are evicted"""
+
+    def __init__(self, budget: int = 128 * 1024 * 1024):
+        """Creates an empty cache. Budget is given in bytes"""
+        self.budget: int = budget
+        self.used: int = 0
+        self.maps: OrderedDict[tuple[int, int], tuple[int, KilometerMap]] = OrderedDict()
+
+    def get(self, region_x: int, region_y: int, version: int) -> KilometerMap:
+        """Returns the cached map of a region, or None if there is no map.
+        A map constructed from an earlier terrain version is evicted and None is returned"""
+        key = (region_x, region_y)
+
+        if key not in self.maps:
+            return None
+
+        cached_version, km_map = self.maps[key]
+
+        if cached_version != version:
+            self.invalidate(region_x, region_y)
+            return None
+
+        self.maps.move_to_end(key)
+        return km_map
+
+    def put(self, region_x: int, region_y: int, version: int, km_map: KilometerMap) -> None:
+        """Caches the map of a region, constructed from the given terrain version.
+        Maps larger than the entire budget are not cached"""
+        self.invalidate(region_x, region_y)
+        size = km_map.get_nbytes()
+
+        if size > self.budget:
+            return
+
+        self.maps[(region_x, region_y)] = (version, km_map)
+        self.used += size
+
+        while self.used > self.budget:
+            key, (cached_version, evicted) = self.maps.popitem(last=False)
+            self.used -= evicted.get_nbytes()
+
+    def invalidate(self, region_x: int, region_y: int) -> None:
+        """Removes the map of a region from the cache"""
+        entry = self.maps.pop((region_x, region_y), None)
+
+        if entry is not None:
+            self.used -= entry[1].get_nbytes()
+
+    def clear(self) -> None:
+        """Removes all maps from the cache"""
+        self.maps.clear()
+        self.used = 0
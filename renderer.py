@@ -0,0 +1,207 @@
+from PyQt5 import QtGui, sip
+from PyQt5.QtCore import QRect, Qt
+from PyQt5.QtGui import QRegion
+from typing import Any, Callable, Optional
+import numpy as np
+
+
+# Most rectangles of a layer painted one by one, see Compositor.get_layer
+MAX_PAINTED_RECTS = 8
+
+
+def create_palette(colors: dict[int, QtGui.QColor], size: int,
+                   default: QtGui.QColor = QtGui.QColor(0, 0, 0)) -> np.ndarray:
+    """Returns a lookup table of 32-bit ARGB pixels, indexed by value.
+    Values without a color get the default color"""
+    palette = np.full(size, default.rgba(), dtype=np.uint32)
+
+    for value, color in colors.items():
+        palette[value] = color.rgba()
+    return palette
+
+
+class PixelImage():
+    """An image with its pixels kept in an array of 32-bit ARGB values, indexed by (y, x).
+    The image shares memory with the array, so edited pixels are drawn without copying"""
+
+    def __init__(self, length: int, height: int):
+        """Creates a transparent image of length x height pixels"""
+        self.length: int = length
+        self.height: int = height
+        self.pixels: np.ndarray = np.zeros((height, length), dtype=np.uint32)
+        # A writable pointer, so painting on the image doesn't detach it from the array
+        self.image = QtGui.QImage(sip.voidptr(self.pixels.ctypes.data), length, height,
+                                  length * 4, QtGui.QImage.Format_ARGB32)
+
+    def draw(self, painter: QtGui.QPainter, x: int = 0, y: int = 0, scale: int = 1,
+             source: QRect = None) -> QRect:
+        """Draws the image with its top left corner at (x, y),
+        stretching each pixel into a scale x scale square.
+        If a source rectangle is given, only those pixels are drawn.
+        Returns the rectangle drawn on"""
+        if source is None:
+            source = self.image.rect()
+
+        target = QRect(x + source.x() * scale, y + source.y() * scale,
+                       source.width() * scale, source.height() * scale)
+        painter.drawImage(target, self.image, source)
+        return target
+
+    def stamp(self, stamps: list[tuple[np.ndarray, tuple[np.ndarray, np.ndarray], int]],
+              size: int) -> None:
+        """Stamps sprites on a grid of size x size pixel cells.
+        Each stamp is given as (cell mask, sprite offsets, pixel value), see create_sprite.
+        Where sprites overlap, cells later in row order are stamped on top,
+        and within a cell, later stamps are on top. Pixels outside the image are left out"""
+        pixels = []
+        keys = []
+        values = []
+
+        for index, (mask, (offset_y, offset_x), value) in enumerate(stamps):
+            cells = np.flatnonzero(mask)
+            rows, columns = np.divmod(cells, mask.shape[1])
+            y = (rows * size)[:, np.newaxis] + offset_y
+            x = (columns * size)[:, np.newaxis] + offset_x
+            inside = (y >= 0) & (y < self.height) & (x >= 0) & (x < self.length)
+
+            pixels.append((y * self.length + x)[inside])
+            keys.append(np.broadcast_to((cells * len(stamps) + index)[:, np.newaxis],
+                                        y.shape)[inside])
+            values.append(np.full(np.count_nonzero(inside), value, dtype=np.uint32))
+
+        if not pixels:
+            return
+
+        order = np.argsort(np.concatenate(keys), kind="stable")
+        pixels = np.concatenate(pixels)[order]
+        values = np.concatenate(values)[order]
+
+        # The last stamp on each pixel is the one on top
+        stamped, last = np.unique(pixels[::-1], return_index=True)
+        self.pixels.reshape(-1)[stamped] = values[::-1][last]
+
+
+def create_sprite(paint: Callable[[QtGui.QPainter], None],
+                  size: int) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the offsets (y, x) of the pixels painted by paint,
+    relative to the top left corner of a size x size cell.
+    Paint draws as if the cell was at (0, 0). Pixels up to a cell outside of it are included"""
+    canvas = PixelImage(size * 3, size * 3)
+    painter = QtGui.QPainter(canvas.image)
+    painter.translate(size, size)
+    paint(painter)
+    painter.end()
+
+    rows, columns = np.nonzero(canvas.pixels)
+    return (rows - size, columns - size)
+
+
+class Compositor():
+    """Draws a stack of transparent image layers.
+    Each layer is painted once, and reused until it's drawn with a different version.
+    Layers split into tiles are only painted again where tiles were edited"""
+
+    def __init__(self, length: int, height: int):
+        """Creates a compositor for layers of length x height pixels"""
+        self.length: int = length
+        self.height: int = height
+        # Version, tile versions and image of each layer, by layer name
+        self.layers: dict[str, tuple[Any, Optional[np.ndarray], QtGui.QImage]] = {}
+        # Names and versions of the layers drawn last, see draw
+        self.drawn: list[tuple[str, Any]] = []
+
+    def get_tile_region(self, edited: np.ndarray, size: int, margin: int = 0) -> QRegion:
+        """Returns the pixels of edited tiles, indexed by (tile y, tile x),
+        each tile covering size x size pixels. Tiles are widened by margin pixels,
+        wrapping around horizontally"""
+        region = QRegion()
+        bounds = QRect(0, 0, self.length, self.height)
+
+        # Runs of edited tiles on each row become one rectangle
+        padded = np.zeros((edited.shape[0], edited.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = edited
+        changes = np.diff(padded, axis=1)
+        rows, starts = np.nonzero(changes == 1)
+        ends = np.nonzero(changes == -1)[1]
+
+        for row, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist()):
+            rect = QRect(start * size - margin, row * size - margin,
+                         (end - start) * size + 2 * margin, size + 2 * margin)
+            for offset in (-self.length, 0, self.length):
+                region += rect.translated(offset, 0) & bounds
+        return region
+
+    def get_layer(self, name: str, version: Any, paint: Callable[[QtGui.QPainter], None],
+                  tiles: Optional[tuple[np.ndarray, int, int]] = None
+                  ) -> tuple[QtGui.QImage, QRegion]:
+        """Returns the image of a layer, and the region painted again.
+        If the cached image has another version, the layer is painted again with paint.
+
+        Args:
+            tiles:
+                (tile versions, tile size, margin) of a layer split into tiles.
+                Where tile versions changed, the tiles and margin pixels around them
+                are painted again. Paint is called once for each rectangle to paint,
+                clipped to it, or once for all of them if there are many"""
+        cached = self.layers.get(name)
+        tile_versions = None if tiles is None else tiles[0].copy()
+
+        if cached is None or cached[0] != version:
+            image = QtGui.QImage(self.length, self.height,
+                                 QtGui.QImage.Format_ARGB32_Premultiplied)
+            region = QRegion(0, 0, self.length, self.height)
+        elif tiles is None:
+            return (cached[2], QRegion())
+        elif cached[1] is None or cached[1].shape != tile_versions.shape:
+            image = cached[2]
+            region = QRegion(0, 0, self.length, self.height)
+        else:
+            image = cached[2]
+            region = self.get_tile_region(cached[1] != tile_versions, *tiles[1:])
+            if region.isEmpty():
+                return (image, region)
+
+        # Each rectangle is painted on its own, so paint only needs to cover its clip rectangle.
+        # Scattered edits are painted at once, instead of paying for each rectangle
+        if region.rectCount() <= MAX_PAINTED_RECTS:
+            parts = [QRegion(rect) for rect in region.rects()]
+        else:
+            parts = [region]
+
+        painter = QtGui.QPainter(image)
+        for part in parts:
+            painter.setClipRegion(part)
+            painter.setCompositionMode(QtGui.QPainter.CompositionMode_Source)
+            painter.fillRect(part.boundingRect(), Qt.transparent)
+            painter.setCompositionMode(QtGui.QPainter.CompositionMode_SourceOver)
+            paint(painter)
+        painter.end()
+
+        self.layers[name] = (version, tile_versions, image)
+        return (image, region)
+
+    def draw(self, painter: QtGui.QPainter, layers: list[tuple], partial: bool = False) -> QRegion:
+        """Draws layers on top of each other, in order. Returns the region drawn.
+        Each layer is given as (name, version, paint function) or
+        (name, version, paint function, tiles), see get_layer.
+        If partial is true, and the painter still shows the layers drawn last,
+        only the regions painted again are drawn"""
+        images = []
+        region = QRegion()
+
+        for layer in layers:
+            image, painted = self.get_layer(*layer)
+            images.append(image)
+            region += painted
+
+        drawn = [(layer[0], layer[1]) for layer in layers]
+        if not partial or drawn != self.drawn:
+            region = QRegion(0, 0, self.length, self.height)
+        self.drawn = drawn
+
+        painter.save()
+        painter.setClipRegion(region)
+        for image in images:
+            painter.drawImage(0, 0, image)
+        painter.restore()
+        return region
@@ -0,0 +1,85 @@
+from generation import GenerationSettings
+from boundary import Boundary
+from world import World
+import numpy as np
+import pytest
+import generation
+import boundary
+import constants
+
+
+ALGORITHMS = ["Relative growth", "Fixed growth", "Flood growth"]
+
+
+def generate(algorithm: str, seed: int) -> World:
+    """Returns a small finished world"""
+    world = World(length=20, height=10, sub_length=80, sub_height=40, seed=seed)
+    return generation.generate(GenerationSettings(algorithm=algorithm), world=world)
+
+
+def get_arrays(world: World) -> list[np.ndarray]:
+    """Returns the terrain and plates of a world"""
+    return [world.region_layers.terrain, world.region_layers.plate,
+            world.subregion_layers.terrain, world.subregion_layers.plate]
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_same_seed_generates_same_world(algorithm: str):
+    first = get_arrays(generate(algorithm, 11))
+    second = get_arrays(generate(algorithm, 11))
+
+    for first_array, second_array in zip(first, second):
+        assert np.array_equal(first_array, second_array)
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_other_seed_generates_other_world(algorithm: str):
+    first = generate(algorithm, 11)
+    second = generate(algorithm, 12)
+
+    assert not np.array_equal(first.subregion_layers.plate, second.subregion_layers.plate)
+
+
+def test_standard_world_matches_command_line():
+    settings = GenerationSettings(high_resolution=False)
+    standard = generation.generate(settings, 7)
+    command_line = generation.generate(settings, 7, World(length=60, height=30, seed=7))
+
+    for first_array, second_array in zip(get_arrays(standard), get_arrays(command_line)):
+        assert np.array_equal(first_array, second_array)
+
+
+def generate_boundary(seed: int, workers: int) -> list:
+    """Returns the walks and terrain of each segment of a generated boundary"""
+    boundary = Boundary(constants.WEST, constants.SOUTH, 12, 12, 1, 0, constants.MOUNTAIN,
+                        constants.LAND, constants.WATER, seed=seed)
+    for exit in (constants.WEST, constants.NORTH, constants.EAST):
+        boundary.add_segment(exit)
+    boundary.generate(workers)
+    return [(list(line.forward_walk), line.get_terrain_grid()) for line in boundary.get_path()]
+
+
+def test_boundary_does_not_depend_on_workers(monkeypatch: pytest.MonkeyPatch):
+    # Small boundaries are generated in-process, unless a pool is forced
+    monkeypatch.setattr(boundary, "MIN_POOL_CELLS", 0)
+    for seed in (1, 2, 3):
+        assert generate_boundary(seed, 1) == generate_boundary(seed, 2)
+    assert generate_boundary(1, 1) != generate_boundary(2, 1)
+
+
+def test_boundary_statistics_per_segment(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(boundary, "MIN_POOL_CELLS", 0)
+    statistics = []
+
+    for workers in (1, 2):
+        generated = Boundary(constants.WEST, constants.SOUTH, 6, 6, 1, 0, constants.MOUNTAIN,
+                             constants.LAND, constants.WATER, line_margin=2, seed=4,
+                             backtrack_steps=4)
+        for exit in (constants.WEST, constants.NORTH, constants.EAST):
+            generated.add_segment(exit)
+        generated.generate(workers)
+        statistics.append(generated.get_statistics())
+
+    assert len(statistics[0]) == 4
+    assert all(segment["steps"] > 0 for segment in statistics[0])
+    assert statistics[0] == statistics[1]
@@ -0,0 +1,83 @@
+from world import World
+import numpy as np
+import constants
+
+
+def build_region_rows(world: World, region_x: int, region_y: int) -> list[tuple]:
+    """Returns the square kilometers of a region as (x, y, terrain, subregion x, subregion y,
+    subregion border) rows, laid out like the original list-based construction"""
+    size = world.region_size
+    vertical = world.subregions[0][0].metrics.vertical_stretch
+    line = []
+    rows = []
+
+    for sub_y in range(size):
+        metrics = world.get_subregion_of_region(0, sub_y, region_x, region_y).metrics
+        for step in range(vertical):
+            line.append(round(metrics.top_stretch
+                              + (metrics.bottom_stretch - metrics.top_stretch) * step / vertical))
+
+    for kilometer_y, stretch in enumerate(line):
+        for x in range(stretch * size):
+            subregion_x = x // stretch
+            subregion_y = kilometer_y // vertical
+            subregion = world.get_subregion_of_region(subregion_x, subregion_y,
+                                                      region_x, region_y)
+            kilometer_x = x - stretch * size // 2
+            border = kilometer_x % stretch == 0 or kilometer_y % vertical == 0
+            rows.append((kilometer_x - stretch * (size // 2), kilometer_y, subregion.terrain,
+                         subregion_x, subregion_y, int(border)))
+    return rows
+
+
+def get_rows(km_map) -> list[tuple]:
+    """Returns the square kilometers of a kilometer map as rows"""
+    data = km_map.as_dicts()
+    return list(zip(data["x"], data["y"], data["terrain"], data["subregion_x"],
+                    data["subregion_y"], data["subregion_border"]))
+
+
+def create_world() -> World:
+    """Returns a small world with varied subregion terrain"""
+    world = World(radius=637, length=20, height=10, sub_length=80, sub_height=40, seed=4)
+    rng = np.random.default_rng(4)
+    world.subregion_layers.terrain[:] = rng.choice(
+        [constants.LAND, constants.WATER, constants.MOUNTAIN],
+        size=world.subregion_layers.terrain.shape)
+    return world
+
+
+def test_construct_region_matches_list_layout():
+    world = create_world()
+
+    for region_x, region_y in ((0, 0), (7, 3), (19, 9)):
+        km_map = world.construct_region(region_x, region_y)
+        assert sorted(get_rows(km_map)) == sorted(build_region_rows(world, region_x, region_y))
+
+
+def test_subregion_ranges_cover_their_squares():
+    world = create_world()
+    km_map = world.construct_region(7, 3)
+
+    for subregion_y in range(world.region_size):
+        for subregion_x in range(world.region_size):
+            start, end = km_map.get_subregion_range(subregion_x, subregion_y)
+            inside = np.zeros(len(km_map), dtype=bool)
+            inside[start:end] = True
+            assert np.array_equal(inside, (km_map.subregion_x == subregion_x)
+                                  & (km_map.subregion_y == subregion_y))
+
+
+def test_update_kilometers_from_region_matches_list_layout():
+    world = create_world()
+    km_map = world.construct_region(7, 3)
+
+    for x, y in ((0, 0), (2, 1), (3, 3)):
+        subregion = world.get_subregion_of_region(x, y, 7, 3)
+        if subregion.terrain == constants.LAND:
+            subregion.set_terrain(constants.WATER)
+        else:
+            subregion.set_terrain(constants.LAND)
+    world.update_kilometers_from_region(world.get_region(7, 3), km_map)
+
+    assert sorted(get_rows(km_map)) == sorted(build_region_rows(world, 7, 3))
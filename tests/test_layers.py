@@ -0,0 +1,80 @@
+from world import World
+import numpy as np
+import constants
+import layers
+
+
+def find_main_terrain(values: np.ndarray, block: int, row: int, column: int) -> int:
+    """Returns the most common value of a square, counted like the original
+    per-region loop: column by column, with ties won by the value counted first"""
+    counts = {}
+
+    for sub_x in range(block):
+        for sub_y in range(block):
+            value = int(values[row * block + sub_y, column * block + sub_x])
+            counts[value] = counts.get(value, 0) + 1
+
+    max_key = None
+    max_value = None
+    for key, value in counts.items():
+        if max_value is None or value > max_value:
+            max_key = key
+            max_value = value
+    return max_key
+
+
+def test_downsample_breaks_ties_like_loop():
+    rng = np.random.default_rng(1)
+
+    for block in (2, 3, 4):
+        values = rng.integers(0, 4, size=(block * 6, block * 10)).astype(np.uint8)
+        rows, columns = np.nonzero(np.ones((6, 10), dtype=bool))
+        result = layers.downsample(values, block, rows, columns)
+
+        expected = [find_main_terrain(values, block, row, column)
+                    for row, column in zip(rows.tolist(), columns.tolist())]
+        assert result.tolist() == expected
+
+
+def test_downsample_tie_goes_to_first_column():
+    # 1 and 2 are tied. Counting column by column finds 2 first, row by row would find 1
+    values = np.array([[0, 1, 1],
+                       [2, 1, 2],
+                       [2, 1, 2]], dtype=np.uint8)
+    result = layers.downsample(values, 3, np.array([0]), np.array([0]))
+    assert result.tolist() == [2]
+
+
+def test_update_regions_from_subregions_matches_loop():
+    world = World(length=20, height=10, sub_length=80, sub_height=40, seed=3)
+    rng = np.random.default_rng(3)
+    terrain = rng.choice([constants.LAND, constants.WATER, constants.MOUNTAIN],
+                         size=world.subregion_layers.terrain.shape).astype(np.uint8)
+    world.subregion_layers.terrain[:] = terrain
+    world.subregion_layers.mark_all_dirty()
+    world.update_regions_from_subregions()
+
+    expected = np.array([[find_main_terrain(terrain, world.region_size, row, column)
+                          for column in range(world.length)]
+                         for row in range(world.height)])
+    assert np.array_equal(world.region_layers.terrain, expected)
+
+
+def test_border_distance_cache_is_limited_by_bytes(monkeypatch):
+    world = World(length=20, height=10, sub_length=80, sub_height=40, seed=3)
+    world.create_plates(7, 1, 1, 0.2, 0.01, 16, 16, 32, world.subregions, False)
+    world.build_plates()
+    world.finish_plates(constants.SUBREGION)
+    store = world.subregion_layers
+    entry = store.plate.size * 4
+    monkeypatch.setattr(layers, "DISTANCE_CACHE_BYTES", entry * 3)
+
+    expected = {}
+    for plate in world.plates:
+        for terrain in (constants.LAND, constants.WATER):
+            expected[plate.id, terrain] = store.get_border_distance(plate.id, terrain).copy()
+            assert store._get_distance_cache_bytes() <= entry * 3
+    assert 1 <= len(store.distance_cache) < len(expected)
+
+    for (plate_id, terrain), distances in expected.items():
+        assert np.array_equal(store.get_border_distance(plate_id, terrain), distances)
@@ -0,0 +1,126 @@
+from world import World
+import numpy as np
+import constants
+
+
+def scan_lines(plate, lines: list[tuple[int, list[tuple[int, int]]]],
+               first_margin: float, second_margin: float) -> np.ndarray:
+    """Returns the land check of scan lines, walked like the original per-region loops.
+    Lines are (length, coordinates along the line) pairs"""
+    land_check = np.zeros(plate.layers.plate.shape, dtype=bool)
+
+    for length, coordinates in lines:
+        first_skip = int(length * first_margin)
+        second_skip = int(length * second_margin)
+        include = length - first_skip - second_skip
+
+        for column, row in coordinates:
+            x, y = plate._get_coordinates(column, row)
+            if plate.layers.plate[y, x] == plate.id:
+                if first_skip > 0:
+                    first_skip -= 1
+                elif include > 0:
+                    land_check[y, x] = True
+                    include -= 1
+                else:
+                    break
+    return land_check
+
+
+def horizontal_lines(plate) -> list:
+    return [(plate.vertical_distance[column],
+             [(column, row) for row in range(plate.north_end[column],
+                                             plate.south_end[column] + 1)])
+            for column in plate.north_end.keys()]
+
+
+def vertical_lines(plate) -> list:
+    return [(plate.horizontal_distance[row],
+             [(column, row) for column in range(plate.west_end[row], plate.east_end[row] + 1)])
+            for row in plate.west_end.keys()]
+
+
+def ascending_lines(plate) -> list:
+    return [(length, [(start_x + step, step) for step in range(plate.max_x)])
+            for start_x, length in plate.ascending_distance.items()]
+
+
+def descending_lines(plate) -> list:
+    return [(length, [(start_x - step, step) for step in range(plate.max_x)])
+            for start_x, length in plate.descending_distance.items()]
+
+
+def create_world() -> World:
+    """Returns a small world with fully expanded plates"""
+    world = World(length=40, height=20, sub_length=80, sub_height=40, seed=5)
+    world.create_plates(7, 1, 1, 0.2, 0.01, 16, 16, 32, world.regions, False)
+    world.build_plates()
+    return world
+
+
+def check_scan(world: World, scan: str, lines, land_check: str,
+               margins: dict[int, tuple[float, float]]) -> None:
+    for plate in world.plates:
+        if plate.pole_type != 0:
+            continue
+        plate.margin = 0.2
+        plate_mask = plate.layers.plate == plate.id
+
+        for type, (first_margin, second_margin) in margins.items():
+            plate.type = type
+            result = getattr(plate.layers, land_check)
+            result[:] = False
+            getattr(plate, scan)(plate_mask)
+
+            expected = scan_lines(plate, lines(plate), first_margin, second_margin)
+            assert np.array_equal(result, expected)
+
+
+def test_horizontal_land_scan_matches_loop():
+    check_scan(create_world(), "_horizontal_land_scan", horizontal_lines,
+               "horizontal_land_check", {constants.CENTER: (0.2, 0.2),
+                                         constants.NORTHWEST: (0, 0.4),
+                                         constants.SOUTHEAST: (0.4, 0)})
+
+
+def test_vertical_land_scan_matches_loop():
+    check_scan(create_world(), "_vertical_land_scan", vertical_lines,
+               "vertical_land_check", {constants.CENTER: (0.2, 0.2),
+                                       constants.NORTHWEST: (0, 0.4),
+                                       constants.SOUTHEAST: (0.4, 0)})
+
+
+def test_ascending_land_scan_matches_loop():
+    check_scan(create_world(), "_ascending_land_scan", ascending_lines,
+               "ascending_land_check", {constants.CENTER: (0.2, 0.2),
+                                        constants.NORTHWEST: (0, 0.4),
+                                        constants.SOUTHEAST: (0.4, 0)})
+
+
+def test_descending_land_scan_matches_loop():
+    check_scan(create_world(), "_descending_land_scan", descending_lines,
+               "descending_land_check", {constants.CENTER: (0.2, 0.2),
+                                         constants.NORTHEAST: (0, 0.4),
+                                         constants.SOUTHWEST: (0.4, 0)})
+
+
+def test_find_boundary_matches_loop():
+    world = World(length=20, height=10, sub_length=80, sub_height=40, seed=5)
+    world.create_plates(7, 1, 1, 0.2, 0.01, 16, 16, 32, world.subregions, False)
+    world.build_plates()
+    world.finish_plates(constants.SUBREGION)
+
+    for plate in world.plates:
+        expected = [region for region in plate.claimed_regions if region.is_boundary()]
+        assert expected
+        assert plate.find_boundary() == expected
+
+
+def test_find_boundary_of_region_plates():
+    # Boundaries are only found on the subregion grid, so region plates have none
+    world = create_world()
+    world.finish_plates(constants.REGION)
+
+    for plate in world.plates:
+        assert len(plate.boundary_cells) > 0
+        assert plate.find_boundary() == []
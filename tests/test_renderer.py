@@ -0,0 +1,93 @@
+from PyQt5 import QtGui, QtWidgets
+from PyQt5.QtCore import QRect
+from renderer import Compositor, PixelImage
+from world import World
+from main import Main
+import numpy as np
+import pytest
+import os
+import constants
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def create_window() -> Main:
+    """Returns a window with a small world of finished plates"""
+    window = Main()
+    window.world = World(radius=6372, length=60, height=30, seed=5)
+    window.world.create_plates(7, 1, 1, 0.2, 0.01, 16, 16, 32, window.world.subregions, False)
+    window.world.build_plates()
+    window.world.finish_plates(constants.SUBREGION)
+    return window
+
+
+@pytest.fixture(scope="module")
+def window() -> Main:
+    return create_window()
+
+
+def grab(window: Main) -> np.ndarray:
+    """Returns the pixels shown on the screen"""
+    image = window.screen.pixmap().toImage().convertToFormat(QtGui.QImage.Format_RGB32)
+    pointer = image.constBits()
+    pointer.setsize(image.byteCount())
+    pixels = np.frombuffer(pointer, np.uint32).reshape(image.height(), -1)
+    return pixels[:, :image.width()].copy()
+
+
+def get_expected_pixels(window: Main) -> np.ndarray:
+    """Returns the terrain colors of the world map, one square of pixels per subregion"""
+    layers = window.world.subregion_layers
+    size = 1440 // layers.length
+    pixels = Main.TERRAIN_PALETTE[layers.terrain]
+    return pixels.repeat(size, axis=0).repeat(size, axis=1)
+
+
+def test_paint_world_matches_palette(window: Main):
+    image = PixelImage(1440, 720)
+    painter = QtGui.QPainter(image.image)
+    window.paint_world(painter)
+    painter.end()
+
+    assert np.array_equal(image.pixels, get_expected_pixels(window))
+
+
+def test_paint_world_within_clip_rectangle(window: Main):
+    image = PixelImage(1440, 720)
+    painter = QtGui.QPainter(image.image)
+    painter.setClipRect(QRect(100, 50, 333, 211))
+    window.paint_world(painter)
+    painter.end()
+
+    expected = np.zeros((720, 1440), dtype=np.uint32)
+    expected[50:261, 100:433] = get_expected_pixels(window)[50:261, 100:433]
+    assert np.array_equal(image.pixels, expected)
+
+
+@pytest.mark.parametrize("detailed", [True, False])
+def test_partial_repaint_matches_full_repaint(detailed: bool):
+    window = create_window()
+    window.view_options.view_grid.setChecked(True)
+    window.view_options.view_lines.setChecked(True)
+    window.view_options.view_plate_borders.setChecked(True)
+    window.view_continents(detailed)
+
+    layers = window.world.subregion_layers
+    rng = np.random.default_rng(1)
+    # Scattered edits, and edits at the corners and edges of the map
+    edits = [(rng.integers(0, layers.height, 1), rng.integers(0, layers.length, 1)),
+             (rng.integers(0, layers.height, 20), rng.integers(0, layers.length, 20)),
+             (np.array([0, layers.height - 1, 5, 7]), np.array([0, layers.length - 1, 0, 3]))]
+
+    for rows, columns in edits:
+        terrain = rng.choice([constants.LAND, constants.WATER, constants.MOUNTAIN],
+                             len(rows)).astype(np.uint8)
+        layers.set_terrain_cells(rows, columns, terrain)
+        window.view_continents(detailed)
+        partial = grab(window)
+
+        window.compositor = Compositor(1440, 720)
+        window.map_shown = False
+        window.view_continents(detailed)
+        assert np.array_equal(partial, grab(window))
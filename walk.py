@@ -0,0 +1,65 @@
+from typing import Iterable, Iterator
+
+
+class Walk():
+    """An ordered path of (x, y) coordinates.
+    Keeps the position of each coordinate in a dictionary,
+    so membership tests, lookups and truncation don't scan the path.
+    Also remembers dead ends, points found to lead nowhere"""
+
+    def __init__(self, points: Iterable[tuple[int, int]] = ()):
+        """Creates a walk through the given points"""
+        self.points: list[tuple[int, int]] = []
+        # First position of each point. Points may repeat in walks allowed to loop
+        self.positions: dict[tuple[int, int], int] = {}
+        self.dead_ends: set[tuple[int, int]] = set()
+        self.extend(points)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        return iter(self.points)
+
+    def __getitem__(self, index: int) -> tuple[int, int]:
+        return self.points[index]
+
+    def __contains__(self, point: tuple[int, int]) -> bool:
+        return point in self.positions
+
+    def append(self, point: tuple[int, int]) -> None:
+        """Adds a point to the end of the walk"""
+        self.positions.setdefault(point, len(self.points))
+        self.points.append(point)
+
+    def extend(self, points: Iterable[tuple[int, int]]) -> None:
+        """Adds points to the end of the walk"""
+        for point in points:
+            self.append(point)
+
+    def index(self, point: tuple[int, int]) -> int:
+        """Returns the first position of a point in the walk
+
+        Raises:
+            ValueError"""
+        try:
+            return self.positions[point]
+        except KeyError:
+            raise ValueError(f"{point} is not in the walk")
+
+    def truncate(self, length: int) -> None:
+        """Removes every point from the given position on.
+        Takes time in proportion to the amount of points removed"""
+        for point in self.points[length:]:
+            if self.positions.get(point, -1) >= length:
+                del self.positions[point]
+        del self.points[length:]
+
+    def clear_from(self, length: int) -> None:
+        """Removes every point from the given position on, and forgets all dead ends"""
+        self.truncate(length)
+        self.dead_ends.clear()
+
+    def clear(self) -> None:
+        """Removes every point, and forgets all dead ends"""
+        self.clear_from(0)
@@ -1,24 +1,37 @@
-from region import Region
+from region import Region, RegionGrid
+from layers import LayerStore
 from plate import Plate
+from plate_flood import PlateFlood
 from region_metrics import RegionMetrics
 from boundary import Boundary
+from coastline import Coastline, find_coastlines
 from line_generator import LineGenerator
-from typing import Any
+from kilometer_map import KilometerMap
+from region_cache import RegionCache
+from random_stream import create_seed, create_stream
 import constants
+import layers
+import numpy as np
 import math
-import random
 
 
 class World():
     """Represents the world"""
 
     def __init__(self, radius: int = 6372, length: int = 72, height: int = 36,
-                 sub_length=360, sub_height=180):
+                 sub_length=360, sub_height=180, km_cache_budget: int = 128 * 1024 * 1024,
+                 seed: int = None):
         """Creates a new world, separated into regions.
         Length/height specify how many regions fit horizontally and vertically.
-        Length should be twice the value of height in order to mimic longitude and latitude"""
+        Length should be twice the value of height in order to mimic longitude and latitude.
+        Constructed regions are cached, using at most km_cache_budget bytes.
+        All randomness is derived from the seed. A random seed is used if none is given"""
         super().__init__()
 
+        if seed is None:
+            seed = create_seed()
+        self.seed: int = seed
+
         self.radius: int = radius
         self.circumference: int = int(2 * radius * math.pi)
         self.area: int = int(4 * math.pow(radius, 2) * math.pi)
@@ -29,27 +42,33 @@ class World():
         self.height = height
         self.sub_length = sub_length
         self.sub_height = sub_height
-        self.region_size = 360 // length
+        self.region_size = sub_length // length
 
-        self.regions: list[list[Region]] = []
-        self.subregions: list[list[Region]] = []
         self.plates: list[Plate] = []
 
-        self.km_squares_dicts: dict[str, list[int]] = None
+        self.km_map: KilometerMap = None
+        self.region_cache = RegionCache(km_cache_budget)
 
         self.fixed_growth = True
+        self.flood: PlateFlood = None
 
         self.boundary: Boundary = None
-
-        for y in range(height):
-            metrics = self._get_region_metric(
-                y, length, height, self.region_height)
-            self.regions.append(self._create_regions(length, metrics))
-
-        for y in range(self.sub_height):
-            metrics = self._get_region_metric(
-                y, sub_length, sub_height, self.subregion_height)
-            self.subregions.append(self._create_regions(sub_length, metrics))
+        # Coastlines of the regions, and the region terrain they were found from
+        self.coastlines: list[Coastline] = None
+        self.coastline_terrain: np.ndarray = None
+
+        # Region variables are stored in layers. Regions are created on access
+        region_metrics = [self._get_region_metric(y, length, height, self.region_height)
+                          for y in range(height)]
+        subregion_metrics = [self._get_region_metric(y, sub_length, sub_height,
+                                                     self.subregion_height)
+                             for y in range(sub_height)]
+
+        self.region_layers = LayerStore(length, height, region_metrics)
+        self.subregion_layers = LayerStore(
+            sub_length, sub_height, subregion_metrics, tile_size=self.region_size)
+        self.regions = RegionGrid(self.region_layers)
+        self.subregions = RegionGrid(self.subregion_layers)
 
     def _get_region_metric(self, y: int, length: int, height: int,
                            vertical_stretch: int) -> RegionMetrics:
@@ -76,13 +95,6 @@ class World():
                              vertical_stretch=vertical_stretch, cost=cost, y=y,
                              length_division=length)
 
-    def _create_regions(self, length: int, metrics: RegionMetrics) -> list[Region]:
-        """Creates a list of regions on the same latitude. These span all longitude values"""
-        circle = []
-        for x in range(length):
-            circle.append(Region(x, metrics))
-        return circle
-
     def get_region(self, x: int, y: int) -> Region:
         """Returns the region at (x,y)"""
         return self.regions[y][x]
@@ -114,31 +126,35 @@ class World():
 
     def get_subregions_by_terrain(self) -> dict[list[Region]]:
         """Returns all subregions divided by terrain"""
+        subregion_layers = self.subregion_layers
         result = {}
 
-        for row in self.subregions:
-            for subregion in row:
-                if subregion.terrain in result:
-                    result[subregion.terrain].append(subregion)
-                else:
-                    result[subregion.terrain] = [subregion]
+        for terrain in np.unique(subregion_layers.terrain):
+            rows, columns = np.nonzero(subregion_layers.terrain == terrain)
+            result[int(terrain)] = [Region(x, subregion_layers.metrics[y], subregion_layers)
+                                    for y, x in zip(rows.tolist(), columns.tolist())]
         return result
 
     def create_plates(self, land_amount: int, water_amount: int, odd_amount: int,
                       margin: float, island_rate: float,
                       min_growth: int, max_growth: int, odd_growth: int,
-                      world_map: list[list[Region]], fixed_growth: bool) -> None:
-        """Creates the starting points of tectonic plates at random coordinates"""
+                      world_map: RegionGrid, fixed_growth: bool,
+                      flood_growth: bool = False) -> None:
+        """Creates the starting points of tectonic plates at random coordinates.
+        Each plate gets its own random stream, derived from the world seed and plate id.
+        With flood growth, all plates are expanded at once by a plate flood"""
         self.fixed_growth = fixed_growth
+        self.flood = None
+        rng = create_stream(self.seed, "plates")
 
         for id in range(land_amount + water_amount + odd_amount):
             if id >= odd_amount + land_amount:
                 type = constants.WATER
-                growth = random.randrange(min_growth, max_growth + 1)
+                growth = rng.randrange(min_growth, max_growth + 1)
                 relative_growth = 0.3
             elif id >= odd_amount:
-                type = random.randrange(9)
-                growth = random.randrange(min_growth, max_growth + 1)
+                type = rng.randrange(9)
+                growth = rng.randrange(min_growth, max_growth + 1)
                 relative_growth = 0.3
             else:
                 type = constants.CENTER
@@ -150,103 +166,157 @@ class World():
                 y = len(world_map) // 2
             else:
                 while True:
-                    x = random.randrange(len(world_map[0]))
-                    y = random.randrange(len(world_map))
+                    x = rng.randrange(len(world_map[0]))
+                    y = rng.randrange(len(world_map))
                     if world_map[y][x].plate == -1:
                         break
 
             self.plates.append(Plate(id=id, world_map=world_map, start_x=x, start_y=y,
                                      type=type, margin=margin, island_rate=island_rate, growth=growth,
-                                     relative_growth=relative_growth))
+                                     relative_growth=relative_growth,
+                                     rng=create_stream(self.seed, "plate", id)))
 
-    def expand_plates(self) -> bool:
-        """Expands all tectonic plates once. Level of expansion is determined by plate growth settings.
-        Returns true when tectonic plates cover the entire world"""
-        finished = True
+        if flood_growth:
+            self.flood = PlateFlood(world_map.layers, self.plates, self.seed)
 
-        for plate in self.plates:
-            if plate.alive:
-                finished = False
-            else:
-                continue
+    def expand_plates(self, record_changes: bool = False) -> np.ndarray:
+        """Expands all tectonic plates once. Level of expansion is determined by plate growth settings.
+        If record_changes is true, returns the flat indexes y * length + x
+        of cells whose plate or activity changed, otherwise None.
+        Recording has a cost, so only use it to show the progress. See plates_expanded"""
+        layers = self.plates[0].layers
+        layers.recording_changes = record_changes
+
+        if self.flood is not None:
+            if self.flood.expand():
+                self.flood.finish()
+                self.flood = None
+        else:
+            for plate in self.plates:
+                if not plate.alive:
+                    continue
+
+                if self.fixed_growth:
+                    plate.expand()
+                else:
+                    plate.expand_blindly()
 
-            if self.fixed_growth:
-                plate.expand()
-            else:
-                plate.expand_blindly()
+        layers.recording_changes = False
+        if record_changes:
+            return layers.pop_plate_changes()
+        return None
 
-        return finished
+    def plates_expanded(self) -> bool:
+        """Returns true when tectonic plates cover the entire world"""
+        return self.flood is None and not any(plate.alive for plate in self.plates)
 
     def build_plates(self) -> None:
         """Expands all tectonic plates until the entire world is covered"""
-        while True:
-            finished = self.expand_plates()
-            if finished:
-                break
+        while not self.plates_expanded():
+            self.expand_plates()
 
     def create_continents(self) -> None:
         """Creates land and water on all plates"""
         for plate in self.plates:
             plate.create_land()
 
-    def find_maximum_key(self, dictionary: dict[Any, int]) -> Any:
-        """Returns the key which holds the dictionarys max value"""
-        max_key = None
-        max_value = None
-
-        for key, value in dictionary.items():
-            if max_value is None or value > max_value:
-                max_key = key
-                max_value = value
-        return max_key
-
-    def find_region_main_terrain(self, region: Region) -> int:
-        """Returns the most common terrain within the subregions of a region"""
-        region_x = region.x
-        region_y = region.metrics.y
-        terrain_count = dict()
-
-        for sub_x in range(self.region_size):
-            for sub_y in range(self.region_size):
-                subregion = self.get_subregion_of_region(
-                    sub_x, sub_y, region_x, region_y)
-
-                if subregion.terrain in terrain_count:
-                    terrain_count[subregion.terrain] += 1
-                else:
-                    terrain_count[subregion.terrain] = 1
-
-        return self.find_maximum_key(terrain_count)
+    def finish_plates(self, precision: str) -> None:
+        """Creates continents on fully expanded plates.
+        Updates the grid which the plates didn't claim, and finds plate boundaries.
+        Give the precision of the plates (REGION or SUBREGION)"""
+        self.region_cache.clear()
+        self.create_continents()
+
+        # The entire world is new, so every part of the other grid is updated
+        if precision == constants.REGION:
+            self.region_layers.mark_all_dirty()
+            self.update_subregions_from_regions()
+        else:
+            self.subregion_layers.mark_all_dirty()
+            self.update_regions_from_subregions()
+
+        self.find_plate_boundaries()
+
+    def create_mountains(self, land_offset: tuple[int, int] = (1, 1),
+                         sea_offset: tuple[int, int] = (2, 2)) -> None:
+        """Creates mountain ranges on the land of every plate at once.
+        Offsets give the (minimum, maximum) distance to the nearest
+        out-of-plate region, like Plate.find_border_offset.
+
+        Args:
+            land_offset:
+                distance range of mountains from land beyond the plate
+            sea_offset:
+                distance range of mountains from water beyond the plate"""
+        if not self.plates:
+            return
+
+        layers = self.plates[0].layers
+        land = layers.get_type_mask(constants.LAND)
+        mountains = np.zeros(land.shape, dtype=bool)
+
+        for terrain, (min_distance, max_distance) in ((constants.LAND, land_offset),
+                                                      (constants.WATER, sea_offset)):
+            distances = layers.get_border_distances(terrain)
+            mountains |= (distances >= max(min_distance, 1)) & (distances <= max_distance)
+
+        layers.set_terrain(mountains & land, constants.MOUNTAIN)
 
     def update_regions_from_subregions(self) -> None:
-        """Sets region variables based on subregion variables"""
-        for y in range(self.height):
-            for x in range(self.length):
-                region = self.get_region(x, y)
-                region.set_terrain(self.find_region_main_terrain(
-                    region), set_update_flag=False)
+        """Sets region variables based on subregion variables.
+        Only regions with edited subregions are updated,
+        along with the square kilometers of the opened region"""
+        rows, columns = self.subregion_layers.pop_dirty_tiles()
+        self.region_layers.terrain[rows, columns] = layers.downsample(
+            self.subregion_layers.terrain, self.region_size, rows, columns)
+        self.region_layers.update_subdivision[rows, columns] = False
+
+        if self.km_map is not None and np.any((columns == self.km_map.region_x)
+                                              & (rows == self.km_map.region_y)):
+            region_x = self.km_map.region_x
+            region_y = self.km_map.region_y
+            self.update_kilometers_from_region(
+                self.get_region(region_x, region_y), self.km_map)
+            self.region_cache.put(region_x, region_y,
+                                  self.subregion_layers.get_tile_version(
+                                      region_x, region_y),
+                                  self.km_map)
 
     def update_subregions_from_regions(self) -> None:
-        """Sets subregion variables based on region variables"""
-        for y in range(self.sub_height):
-            for x in range(self.sub_length):
-                ry = y // self.region_size
-                region = self.get_region(x // self.region_size, ry)
-                subregion = self.get_subregion(x, y)
-                subregion.set_terrain(region.terrain)
-
-                if subregion.plate == -1:
-                    subregion.plate = region.plate
-
-    def update_kilometers_from_subregion(self, subregion: Region, km_map: dict[str, list[int]]) -> None:
-        """Updates the terrain of all square kilometers in a subregion"""
-        for index in range(len(km_map["x"])):
-            if km_map["subregion_x"][index] == subregion.x \
-                    and km_map["subregion_y"][index] == subregion.metrics.y:
-                km_map["terrain"][index] = subregion.terrain
+        """Sets subregion variables based on region variables.
+        Only subregions of edited regions are updated"""
+        rows, columns = self.region_layers.pop_dirty_tiles()
+        block = self.region_size
+        shape = (self.height, block, self.length, block)
+        subregion_layers = self.subregion_layers
+
+        # Squares of subregions, indexed by (region, subregion y, subregion x)
+        terrain = subregion_layers.terrain.reshape(shape)
+        terrain[rows, :, columns, :] = \
+            self.region_layers.terrain[rows, columns, np.newaxis, np.newaxis]
+        subregion_layers.update_subdivision.reshape(shape)[
+            rows, :, columns, :] = True
+        # Tiles of the subregion layers are regions
+        subregion_layers.tile_versions[rows, columns] += 1
+
+        plate = subregion_layers.plate.reshape(shape)
+        squares = plate[rows, :, columns, :]
+        region_plate = np.broadcast_to(
+            self.region_layers.plate[rows, columns, np.newaxis, np.newaxis], squares.shape)
+        plate[rows, :, columns, :] = np.where(
+            squares == -1, region_plate, squares)
+
+        subregion_layers.dirty_tiles[rows, columns] = True
+
+    def update_kilometers_from_subregion(self, subregion: Region, km_map: KilometerMap) -> None:
+        """Updates the terrain of all square kilometers in a subregion.
+        The subregion must belong to the region described by the kilometer map"""
+        km_map.set_subregion_terrain(subregion.x % self.region_size,
+                                     subregion.metrics.y % self.region_size,
+                                     subregion.terrain)
 
     def update_kilometers_from_region(self, active_region: Region,
-                                      km_map: dict[str, list[int]]) -> None:
+                                      km_map: KilometerMap) -> None:
         """Updates the terrain of all square kilometers in a region"""
         for y in range(self.region_size):
             for x in range(self.region_size):
@@ -257,23 +327,21 @@ class World():
                     self.update_kilometers_from_subregion(subregion, km_map)
                     subregion.update_subdivision = False
 
+    @property
+    def km_squares_dicts(self) -> dict[str, list[int]]:
+        """The opened region as a dictionary of lists. Prefer km_map"""
+        if self.km_map is None:
+            return None
+        return self.km_map.as_dicts()
+
     def find_plate_boundaries(self):
-        """Finds plate boundaries on a subregion level"""
-        for y in range(self.sub_height - 1):
-            for x in range(self.sub_length):
-                nx = (x + 1) % self.sub_length
-                ny = y + 1
-                region = self.subregions[y][x]
-                east = self.subregions[y][nx]
-                south = self.subregions[ny][x]
-
-                if region.plate != east.plate:
-                    region.east_boundary = True
-                    east.west_boundary = True
-
-                if region.plate != south.plate:
-                    region.south_boundary = True
-                    south.north_boundary = True
+        """Finds plate boundaries on a subregion level,
+        and gives each plate an index of its boundary subregions"""
+        self.subregion_layers.find_boundaries()
+        boundary_cells = self.subregion_layers.get_boundary_cells()
+
+        for plate in self.plates:
+            plate.boundary_cells = boundary_cells.get(plate.id, np.zeros(0, dtype=np.int64))
 
     def get_plate(self, plate_id: int) -> Plate:
         """Returns the plate with the given id
@@ -288,296 +356,147 @@ class World():
 
     def get_land_area(self) -> int:
         """Calculates total land area"""
-        area = 0
-        for circle in self.regions:
-            for region in circle:
-                if constants.is_type(region.terrain, constants.LAND):
-                    area += region.metrics.area
-        return area
+        return self.region_layers.get_area(
+            self.region_layers.get_type_mask(constants.LAND))
 
     def get_sea_area(self) -> int:
         """Calculates total sea area"""
-        area = 0
-        for circle in self.regions:
-            for region in circle:
-                if constants.is_type(region.terrain, constants.WATER):
-                    area += region.metrics.area
-        return area
-
-    def _find_coastline_exit(self, entrance: int, northeast: int, southeast: int,
-                             southwest: int, northwest: int,
-                             enclosed_terrain: int = constants.LAND) -> int:
-        """Finds the direction of the coastline exit,
-        given the terrain of four cells in a square.
-        Assumes clockwise travel around a land mass.
-        In the case that two land masses meet on a diagonal,
-        the coastline exit of the current landmass is returned."""
-
-        # I used to do something like northeast == LAND and northwest == WATER
-        # which was easier to read. But it wouldn't let me find something like
-        # lake shores, forest edges or coastline edges
-        # where there are some mountains by the shore
-        if constants.is_type(northeast, enclosed_terrain) and \
-                constants.is_type(northwest, enclosed_terrain) == False:
-            if constants.is_type(southwest, enclosed_terrain) \
-                    and constants.is_type(southeast, enclosed_terrain) == False:
-                # Rare case of diagonal land masses. Either go EAST to NORTH or WEST to SOUTH
-                return constants.angle_direction(entrance, 6)
-            else:
-                return constants.NORTH
-        elif constants.is_type(southeast, enclosed_terrain) and \
-                constants.is_type(northeast, enclosed_terrain) == False:
-            if constants.is_type(northwest, enclosed_terrain) and \
-                    constants.is_type(southwest, enclosed_terrain) == False:
-                return constants.turn_direction(entrance, 6)
-            else:
-                return constants.EAST
-        elif constants.is_type(southwest, enclosed_terrain) and \
-                constants.is_type(southeast, enclosed_terrain) == False:
-            return constants.SOUTH
-        elif constants.is_type(northwest, enclosed_terrain) and \
-                constants.is_type(southwest, enclosed_terrain) == False:
-            return constants.WEST
-
-    def _find_coastline_entrance(self, exit: int, northeast: int, southeast: int,
-                                 southwest: int, northwest: int,
-                                 enclosed_terrain: int = constants.LAND) -> int:
-        """Finds the direction of the coastline entrance,
-        given the terrain of four cells in a square.
-        Assumes clockwise travel around a land mass.
-        In the case that two land masses meet on a diagonal,
-        the coastline entrance of the current landmass is returned."""
-
-        if constants.is_type(northeast, enclosed_terrain) and \
-                constants.is_type(southeast, enclosed_terrain) == False:
-            if constants.is_type(southwest, enclosed_terrain) and \
-                    constants.is_type(northwest, enclosed_terrain) == False:
-                # Rare case of diagonal land masses. Either go EAST to NORTH or WEST to SOUTH
-                return constants.angle_direction(exit, 2)
-            else:
-                return constants.EAST
-        elif constants.is_type(southeast, enclosed_terrain) and \
-                constants.is_type(southwest, enclosed_terrain) == False:
-            if constants.is_type(northwest, enclosed_terrain) and \
-                    constants.is_type(northeast, enclosed_terrain) == False:
-                return constants.angle_direction(exit, 2)
-            else:
-                return constants.SOUTH
-        elif constants.is_type(southwest, enclosed_terrain) and \
-                constants.is_type(northwest, enclosed_terrain) == False:
-            return constants.WEST
-        elif constants.is_type(northwest, enclosed_terrain) and \
-                constants.is_type(northeast, enclosed_terrain) == False:
-            return constants.NORTH
-
-    def _find_square_regions(self, x: int, y: int, dir: int) -> tuple[Region]:
-        """Returns a tuple of regions in order (NORTHEAST, SOUTHEAST, SOUTHWEST, NORTHWEST)
-        given the coordinates and relative placement of one of these regions"""
-        result = [None, None, None, None]
-
-        if dir == constants.NORTHEAST:
-            result[0] = self.get_region(x, y)
-            result[1] = self.get_next_region(x, y, constants.SOUTH)
-            result[2] = self.get_next_region(x, y, constants.SOUTHWEST)
-            result[3] = self.get_next_region(x, y, constants.WEST)
-        elif dir == constants.SOUTHEAST:
-            result[0] = self.get_next_region(x, y, constants.NORTH)
-            result[1] = self.get_region(x, y)
-            result[2] = self.get_next_region(x, y, constants.WEST)
-            result[3] = self.get_next_region(x, y, constants.NORTHWEST)
-        elif dir == constants.SOUTHWEST:
-            result[0] = self.get_next_region(x, y, constants.NORTHEAST)
-            result[1] = self.get_next_region(x, y, constants.EAST)
-            result[2] = self.get_region(x, y)
-            result[3] = self.get_next_region(x, y, constants.NORTH)
-        elif dir == constants.NORTHWEST:
-            result[0] = self.get_next_region(x, y, constants.EAST)
-            result[1] = self.get_next_region(x, y, constants.SOUTHEAST)
-            result[2] = self.get_next_region(x, y, constants.SOUTH)
-            result[3] = self.get_region(x, y)
-        return result
-
-    def _find_region_in_direction(self, x: int, y: int, dir: int,
-                                  terrain: int, limit: int = 60) -> Region:
-        """Finds the first region with the given terrain,
-        starting at (x,y) and moving in the given direction.
-        A search limit can be provided.
-        If the search succeeds, returns the
-        the last region not to have the given terrain.
-        If the search fails, returns None."""
-
-        region = self.get_region(x, y)
-
-        if region.terrain == terrain:
+        return self.region_layers.get_area(
+            self.region_layers.get_type_mask(constants.WATER))
+
+    def find_coastlines(self) -> list[Coastline]:
+        """Returns every coastline of the world on a region level, travelling clockwise around land.
+        Coastlines are cached until the terrain of the regions changes"""
+        if self.coastlines is None or not np.array_equal(self.coastline_terrain,
+                                                         self.region_layers.terrain):
+            self.coastline_terrain = self.region_layers.terrain.copy()
+            self.coastlines = find_coastlines(self.region_layers.get_type_mask(constants.LAND))
+        return self.coastlines
+
+    def find_region_coastline(self, x: int, y: int, backtrack_steps: int = 4) -> list[Region]:
+        """Selects the coastline nearest to the given land region, for generating a boundary.
+        The boundary backtracks the given amount of steps from dead ends, see Boundary.
+        Returns a list of the land regions along the coastline.
+        If the coordinates points to a region which isn't land, returns None"""
+        if not constants.is_type(self.get_region(x, y).terrain, constants.LAND):
             return None
 
-        while limit > 0:
-            x, y = constants.get_next_coordinates(x, y, dir)
-            previous_region = region
-            limit -= 1
-
-            if constants.within_bounds(x, y, self.length, self.height):
-                region = self.get_region(x, y)
-                if region.terrain == constants.WATER:
-                    return previous_region
-            else:
-                break
-
-    def find_region_coastline(self, x: int, y: int) -> list[Region]:
-        """Generate a random coastline for the given a land region.
-        Returns a list of coastline regions.
-        If the coordinates points to an ocean region, returns None"""
-
-        # TODO fix errors at the poles. Try ending the coastline
-        # Then, go back to the starting point, change to counter-clockwise and generate
-        # Some functions assume clockwise direction
-
-        coastline = []
-
-        # If the user selected a landmass in the middle of a continent, I search outwards
-        # Search north first. Algorithm will be less than efficient if coastline
-        # is nearby but not to the north
-        # TODO but that's no good. The user should click on the actual coastline
-        # or on a region one cell away from it
-        for dir in range(1, 8, 2):
-            region = self._find_region_in_direction(
-                x, y, dir, constants.WATER)
-
-            if region is not None:
-                coastline.append(region)
-                # This will find ne, se, sw, nw regions surrounding a relevant coastline
-                surroundings = self._find_square_regions(region.x, region.metrics.y,
-                                                         constants.angle_direction(dir, 5))
-
-                entrance = constants.angle_direction(dir, 6)
-                exit = self._find_coastline_exit(entrance, *surroundings)
-                start_x = region.x
-                start_y = region.metrics.y
-                start_entrance = entrance
-
-                # The boundary is as large as a region,
-                # located in the middle of the surroundings
-                # Use the northwest region to calculate starting coordinates
-                boundary_x = surroundings[3].x * \
-                    self.region_size + self.region_size // 2
-                boundary_y = surroundings[3].metrics.y * \
-                    self.region_size + self.region_size // 2
-
-                self.boundary = Boundary(entrance=entrance,
-                                         exit=exit,
-                                         length=self.region_size,
-                                         height=self.region_size,
-                                         start_x=boundary_x,
-                                         start_y=boundary_y,
-                                         line_terrain=constants.LAND,
-                                         primary_terrain=constants.LAND,
-                                         secondary_terrain=constants.WATER)
-                break
-        if region is None:
+        coastlines = self.find_coastlines()
+        if not coastlines:
             return None
 
-        while True:
-            entrance = constants.flip_direction(exit)
-            # Find next entrance region from coastline and exit direction
-            # The coastline is searched in a clockwise direction,
-            # meaning I can always get the correct entrance region from the exit direction
-            if exit == constants.NORTH:
-                # So previous exit NORTH means exit region is NORTHEAST
-                # NORTHEAST has index 0 in surroundings
-                # Flip exit region to get entrance region SOUTHEAST
-                region = surroundings[0]
-                surroundings = self._find_square_regions(
-                    region.x, region.metrics.y, constants.SOUTHEAST)
-            elif exit == constants.EAST:
-                region = surroundings[1]
-                surroundings = self._find_square_regions(
-                    region.x, region.metrics.y, constants.SOUTHWEST)
-            elif exit == constants.SOUTH:
-                region = surroundings[2]
-                surroundings = self._find_square_regions(
-                    region.x, region.metrics.y, constants.NORTHWEST)
-            elif exit == constants.WEST:
-                region = surroundings[3]
-                surroundings = self._find_square_regions(
-                    region.x, region.metrics.y, constants.NORTHEAST)
-
-            if region.x == start_x and region.metrics.y == start_y and entrance == start_entrance:
-                return coastline
-            else:
-                exit = self._find_coastline_exit(entrance, *surroundings)
-
-                coastline.append(region)
-                self.boundary.add_segment(exit)
+        regions = [coastline.get_enclosed_regions(self.length) for coastline in coastlines]
+        region_x = np.concatenate([column for column, row in regions])
+        region_y = np.concatenate([row for column, row in regions])
+        owners = np.repeat(np.arange(len(coastlines)), [len(coastline) for coastline in coastlines])
+
+        distance_x = np.abs(region_x - x)
+        distance_x = np.minimum(distance_x, self.length - distance_x)
+        nearest = owners[np.argmin(distance_x ** 2 + (region_y - y) ** 2)]
+        coastline = coastlines[nearest]
+
+        # Each boundary cell is as large as a region, centered between the four regions of a square
+        self.boundary = Boundary(entrance=coastline.entrance,
+                                 exit=int(coastline.exits[0]),
+                                 length=self.region_size,
+                                 height=self.region_size,
+                                 start_x=coastline.x * self.region_size + self.region_size // 2,
+                                 start_y=coastline.y * self.region_size + self.region_size // 2,
+                                 line_terrain=constants.LAND,
+                                 primary_terrain=constants.LAND,
+                                 secondary_terrain=constants.WATER,
+                                 seed=self.seed,
+                                 backtrack_steps=backtrack_steps)
+
+        for exit in coastline.exits[1:].tolist():
+            self.boundary.add_segment(exit)
+
+        column, row = regions[nearest]
+        return [self.get_region(x, y) for x, y in zip(column.tolist(), row.tolist())]
 
     def apply_line_on_region(self, line: LineGenerator):
-        """Generates terrain using a line generator"""
+        """Generates terrain using a line generator.
+        Subregions already of the generated terrain type, and unpainted cells, are kept.
+        The grid wraps around horizontally, and rows beyond the poles are left out"""
         start_x, start_y = line.get_grid_offset()
-
-        for x in range(line.length):
-            for y in range(line.height):
-                subregion = self.get_subregion(
-                    (start_x + x) % self.length, start_y + y)
-                terrain = line.get_terrain(x, y)
-
-                if not constants.is_type(subregion.terrain, terrain):
-                    subregion.set_terrain(terrain)
-
-    def generate_region_coastline(self):
-        """Generates terrain using the saved boundary"""
+        terrain = line.get_terrain_array()
+        rows = start_y + np.arange(terrain.shape[0])
+        columns = (start_x + np.arange(terrain.shape[1])) % self.sub_length
+
+        inside = (rows >= 0) & (rows < self.sub_height)
+        rows = rows[inside]
+        terrain = terrain[inside]
+
+        current = self.subregion_layers.terrain[np.ix_(rows, columns)]
+        changed = (terrain >= 0) & ~layers.get_type_mask(current, np.maximum(terrain, 0))
+        changed_rows, changed_columns = np.nonzero(changed)
+        self.subregion_layers.set_terrain_cells(rows[changed_rows], columns[changed_columns],
+                                                terrain[changed_rows, changed_columns])
+
+    def generate_region_coastline(self, workers: int = 1):
+        """Generates terrain using the saved boundary.
+        Boundary segments are generated by the given amount of worker processes"""
         if self.boundary is not None:
-            self.boundary.generate()
-
-        for line in self.boundary.get_path():
-            self.apply_line_on_region(line)
-
-    def construct_region(self, region_x: int, region_y: int) -> dict[str, list[int]]:
-        """Constructs the region at (x, y) down to kilometer-level precision"""
-
-        vertical = self.subregions[0][0].metrics.vertical_stretch
-        # If I have regions in this format, it'll be hard to navigate in compass directions
-        # I could try something like
-        # data = {(x, y): {terrain: int, subregion_x: int, subregion_y: int, subregion_border: int}}
-        # I don't need to use a two-dimensional list, this should be faster
-        # More importantly, it allows for negative indexes
-        data = {"x": [], "y": [], "terrain": [],
-                "subregion_x": [], "subregion_y": [],
-                "subregion_border": []}
-        line = []
-
-        for sub_y in range(self.region_size):
-            subregion = self.get_subregion_of_region(
-                0, sub_y, region_x, region_y)
-            top = subregion.metrics.top_stretch
-            bottom = subregion.metrics.bottom_stretch
-
-            for step in range(vertical):
-                horizontal = round(top + (bottom - top) * step / vertical)
-                line.append(horizontal)
-
-        for kilometer_y, stretch in enumerate(line):
-            for x in range(stretch * self.region_size):
-                subregion_x = x // stretch
-                subregion_y = kilometer_y // vertical
-                subregion = self.get_subregion_of_region(
-                    subregion_x, subregion_y, region_x, region_y)
-
-                kilometer_x = x - stretch * self.region_size // 2
-
-                # entry = dict()
-                # Add some stuff...
-                # data[(kilometer_x, kilometer_y)] = entry
-
-                data["x"].append(kilometer_x - stretch *
-                                 (self.region_size // 2))
-                data["y"].append(kilometer_y)
-                data["subregion_x"].append(subregion_x)
-                data["subregion_y"].append(subregion_y)
-                data["terrain"].append(subregion.terrain)
-
-                if kilometer_x % stretch == 0 or kilometer_y % vertical == 0:
-                    data["subregion_border"].append(1)
-                else:
-                    data["subregion_border"].append(0)
-
-        self.km_squares_dicts = data
-        return self.km_squares_dicts
+            self.boundary.generate(workers)
+
+            for line in self.boundary.get_path():
+                self.apply_line_on_region(line)
+
+    def construct_region(self, region_x: int, region_y: int) -> KilometerMap:
+        """Constructs the region at (x, y) down to kilometer-level precision.
+        Reuses the cached construction if the region hasn't been edited since"""
+        version = self.subregion_layers.get_tile_version(region_x, region_y)
+        km_map = self.region_cache.get(region_x, region_y, version)
+
+        if km_map is None:
+            km_map = self._build_region(region_x, region_y)
+            self.region_cache.put(region_x, region_y, version, km_map)
+
+        self.km_map = km_map
+        return self.km_map
+
+    def _build_region(self, region_x: int, region_y: int) -> KilometerMap:
+        """Lays out the square kilometers of the region at (x, y)"""
+        size = self.region_size
+        vertical = self.subregion_layers.metrics[0].vertical_stretch
+
+        # Horizontal stretch of every kilometer row, indexed by (subregion y, row within subregion)
+        metrics = self.subregion_layers.metrics[region_y * size:(region_y + 1) * size]
+        top = np.array([row.top_stretch for row in metrics])[:, np.newaxis]
+        bottom = np.array([row.bottom_stretch for row in metrics])[:, np.newaxis]
+        line = np.round(top + (bottom - top) * np.arange(vertical) / vertical).astype(np.int64)
+
+        # Square kilometers are laid out subregion by subregion,
+        # so that each subregion covers a contiguous index range.
+        # A segment is a kilometer row within a subregion, indexed by (subregion y, subregion x, row)
+        shape = (size, size, vertical)
+        segment_y, segment_x, segment_row = np.indices(shape).reshape(3, -1)
+        stretch = np.broadcast_to(line[:, np.newaxis, :], shape).reshape(-1)
+        kilometer_y = segment_y * vertical + segment_row
+
+        segment_start = np.cumsum(stretch) - stretch
+        subregion_ranges = np.stack(
+            (segment_start.reshape(size, size, vertical)[:, :, 0],
+             (segment_start + stretch).reshape(size, size, vertical)[:, :, -1]), axis=-1)
+
+        segment = np.repeat(np.arange(len(stretch)), stretch)
+        offset = np.arange(len(segment)) - segment_start[segment]
+        stretch = stretch[segment]
+        kilometer_y = kilometer_y[segment]
+        subregion_x = segment_x[segment]
+        subregion_y = segment_y[segment]
+
+        kilometer_x = subregion_x * stretch + offset - stretch * size // 2
+        terrain = self.subregion_layers.terrain[region_y * size:(region_y + 1) * size,
+                                                region_x * size:(region_x + 1) * size]
+
+        return KilometerMap(
+            region_x=region_x, region_y=region_y,
+            x=(kilometer_x - stretch * (size // 2)).astype(np.int16),
+            y=kilometer_y.astype(np.int16),
+            terrain=terrain[subregion_y, subregion_x],
+            subregion_x=subregion_x.astype(np.int16),
+            subregion_y=subregion_y.astype(np.int16),
+            subregion_border=(kilometer_x % stretch == 0) | (
+                kilometer_y % vertical == 0),
+            subregion_ranges=subregion_ranges)